@@ -0,0 +1,133 @@
+import bisect
+import itertools
+import threading
+
+TOLERANCE = 0.01
+
+
+class SortedTargets:
+    def __init__(self):
+        self.keys = []
+        self.entries = []
+
+    def add(self, target, seq, alert):
+        i = bisect.bisect_right(self.keys, target)
+        self.keys.insert(i, target)
+        self.entries.insert(i, (seq, alert))
+
+    def discard(self, seqs):
+        kept = [(key, entry) for key, entry in zip(self.keys, self.entries) if entry[0] not in seqs]
+        self.keys = [key for key, _ in kept]
+        self.entries = [entry for _, entry in kept]
+
+    def pop_upto(self, price):
+        i = bisect.bisect_right(self.keys, price)
+        popped = self.entries[:i]
+        del self.keys[:i], self.entries[:i]
+        return popped
+
+    def pop_from(self, price):
+        i = bisect.bisect_left(self.keys, price)
+        popped = self.entries[i:]
+        del self.keys[i:], self.entries[i:]
+        return popped
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class SymbolAlerts:
+    def __init__(self):
+        self.above = SortedTargets()
+        self.below = SortedTargets()
+        self.pending = []
+        self.last_price = None
+
+    def __len__(self):
+        return len(self.above) + len(self.below) + len(self.pending)
+
+
+def alert_targets(alert):
+    percent = alert.get("percent")
+    if percent:
+        reference = alert["target_price"]
+        return [(reference * (1 + percent / 100), "above"), (reference * (1 - percent / 100), "below")]
+    return [(alert["target_price"], None)]
+
+
+class AlertIndex:
+    def __init__(self):
+        self._symbols = {}
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+
+    def _place(self, entry, seq, alert, target, direction, price=None):
+        if direction is None:
+            price = entry.last_price if price is None else price
+            if price is None:
+                entry.pending.append((seq, alert, target))
+                return False
+            if abs(price - target) <= TOLERANCE:
+                return True
+            direction = "above" if target > price else "below"
+        (entry.above if direction == "above" else entry.below).add(target, seq, alert)
+        return False
+
+    def _add(self, alert, price=None):
+        entry = self._symbols.setdefault(alert["symbol"], SymbolAlerts())
+        seq = next(self._seq)
+        for target, direction in alert_targets(alert):
+            if self._place(entry, seq, alert, target, direction, price):
+                entry.pending.append((seq, alert, target))
+
+    def add(self, alert, price=None):
+        with self._lock:
+            self._add(alert, price)
+
+    def rebuild(self, alerts):
+        with self._lock:
+            last_prices = {symbol: entry.last_price for symbol, entry in self._symbols.items()}
+            self._symbols = {}
+            for symbol, price in last_prices.items():
+                if price is not None:
+                    self._symbols.setdefault(symbol, SymbolAlerts()).last_price = price
+            for alert in alerts:
+                self._add(alert)
+
+    def _discard(self, symbol, matches):
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            if entry is None:
+                return
+            seqs = {seq for seq, alert in entry.above.entries + entry.below.entries if matches(alert)}
+            seqs.update(seq for seq, alert, _ in entry.pending if matches(alert))
+            entry.above.discard(seqs)
+            entry.below.discard(seqs)
+            entry.pending = [item for item in entry.pending if item[0] not in seqs]
+
+    def remove(self, chat_id, symbol):
+        self._discard(symbol, lambda alert: str(alert["chat_id"]) == str(chat_id))
+
+    def discard(self, symbol, alert_id):
+        self._discard(symbol, lambda alert: alert.get("id") == alert_id)
+
+    def update(self, symbol, price):
+        with self._lock:
+            entry = self._symbols.get(symbol)
+            if entry is None:
+                return []
+            entry.last_price = price
+
+            triggered = {}
+            pending, entry.pending = entry.pending, []
+            for seq, alert, target in pending:
+                if self._place(entry, seq, alert, target, None):
+                    triggered[seq] = alert
+            crossed = entry.above.pop_upto(price + TOLERANCE) + entry.below.pop_from(price - TOLERANCE)
+            for seq, alert in crossed:
+                triggered[seq] = alert
+
+            if any(alert.get("percent") for alert in triggered.values()):
+                entry.above.discard(triggered)
+                entry.below.discard(triggered)
+            return list(triggered.values())
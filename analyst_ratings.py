@@ -0,0 +1,56 @@
+import threading
+import time
+
+import cloudscraper
+import pandas as pd
+
+from metrics import external_calls
+
+RATINGS_URL = "https://api.fintables.com/analyst-ratings/?brokerage_id=&code=&in_model_portfolio"
+RETRY_AFTER = 60
+
+
+class AnalystRatings:
+    def __init__(self, ttl=1800):
+        self.ttl = ttl
+        self.scraper = cloudscraper.CloudScraper()
+        self.loaded_at = 0
+        self._by_code = {}
+        self._lock = threading.Lock()
+
+    def _build(self, results):
+        df = pd.DataFrame(results)
+
+        df["title"] = df["brokerage"].apply(lambda x: x.get("title") if isinstance(x, dict) else None)
+        df = df[["code", "title", "type", "published_at", "price_target", "in_model_portfolio"]]
+        df["published_at"] = pd.to_datetime(df["published_at"]).dt.strftime("%Y-%m-%d")
+        df.columns = ["Hisse Kodu", "Kurum", "Öneri", "Öneri Tarihi", "Fiyat Hedefi", "Model Portföy"]
+        df["Model Portföy"] = df["Model Portföy"].replace({True: "Var", False: "Yok"})
+
+        return {code: group.reset_index(drop=True) for code, group in df.groupby("Hisse Kodu")}
+
+    def _refresh(self):
+        try:
+            with external_calls.time(target="fintables"):
+                results = self.scraper.get(RATINGS_URL, timeout=30).json()["results"]
+            self._by_code = self._build(results)
+            self.loaded_at = time.monotonic()
+            print(f"🧠 Analist önerileri güncellendi: {len(self._by_code)} hisse")
+        except Exception as e:
+            self.loaded_at = time.monotonic() - self.ttl + RETRY_AFTER
+            print(f"Fintables veri hatası: {e}")
+
+    def refresh(self):
+        with self._lock:
+            self._refresh()
+
+    def is_stale(self):
+        return not self.loaded_at or time.monotonic() - self.loaded_at > self.ttl
+
+    def get(self, code):
+        if self.is_stale():
+            with self._lock:
+                if self.is_stale():
+                    self._refresh()
+        ratings = self._by_code.get(code)
+        return None if ratings is None else ratings.copy()
@@ -1,30 +1,60 @@
-import yfinance as yf
-import pandas as pd
 from datetime import datetime
+import re
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
 import os
 import schedule
 import time
-import matplotlib.pyplot as plt
+import json
+import queue
+import threading
 from veritabani import TOKEN
-import cloudscraper
 from dotenv import load_dotenv
-from supabase import create_client, Client
 from selenium.webdriver import Chrome
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import glob
+import atexit
 import tempfile
-from bs4 import BeautifulSoup
-import seaborn as sns
+from concurrent.futures import ThreadPoolExecutor
+from market_data import get_quote, get_quotes, indexed_ticker, quote_cache, resolve_symbols
+from indicators import rsi, sma, stack_closes, volatility
+from valuation import value_portfolio, value_portfolios
+from history_store import HISTORY_DIR, HISTORY_KEEP_DAYS, HISTORY_REFRESH, HistoryStore
+from fund_catalog import FundCatalog
+from tefas import FUND_URL, INFO_XPATHS, MISSING, fetch_fund_page
+from driver_pool import PROFILE_PREFIX, DriverPool, purge_stale_profiles
+from analyst_ratings import AnalystRatings
+from broadcast import Broadcaster
+from charts import (
+    ChartCache,
+    ChartRenderer,
+    render_comparison_chart,
+    render_fund_chart,
+    render_ma_chart,
+    render_portfolio_chart,
+    render_table,
+)
+from price_feed import ReplayFeed, YahooStreamFeed
+from repository import Repository
+from storage import create_storage
+from metrics import METRICS_DUMP_MINUTES, METRICS_PORT, external_calls, handler_latency, registry, serve, timed
 
 load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+SQLITE_PATH = os.getenv("SQLITE_PATH", "bot.db")
+repository = Repository(create_storage(
+    STORAGE_BACKEND,
+    sqlite_path=SQLITE_PATH,
+    supabase_url=SUPABASE_URL,
+    supabase_key=SUPABASE_KEY,
+))
 
 if not TOKEN:
     raise ValueError("Hata: TOKEN bulunamadı. Lütfen .env dosyasında TOKEN değerini tanımlayın.")
@@ -32,6 +62,55 @@ if not TOKEN:
 download_dir = os.path.abspath("downloads")
 os.makedirs(download_dir, exist_ok=True)
 excel_file_path = os.path.join(download_dir, "tefas_funds.xls")
+fund_catalog = FundCatalog(excel_file_path)
+
+TELEGRAM_API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+POLL_TIMEOUT = int(os.getenv("POLL_TIMEOUT", "30"))
+UPDATE_WORKERS = int(os.getenv("UPDATE_WORKERS", "4"))
+BOT_RUNTIME = os.getenv("BOT_RUNTIME", "threads")
+TEFAS_FETCH_MODE = os.getenv("TEFAS_FETCH_MODE", "http")
+DRIVER_POOL_SIZE = int(os.getenv("DRIVER_POOL_SIZE", "2"))
+DRIVER_MAX_USES = int(os.getenv("DRIVER_MAX_USES", "50"))
+DRIVER_CHECKOUT_TIMEOUT = float(os.getenv("DRIVER_CHECKOUT_TIMEOUT", "120"))
+ANALYST_RATINGS_TTL = int(os.getenv("ANALYST_RATINGS_TTL", "1800"))
+RECONCILE_MINUTES = int(os.getenv("RECONCILE_MINUTES", "10"))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "25"))
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+PRICE_FEED = os.getenv("PRICE_FEED", "poll")
+STREAM_MAX_AGE = int(os.getenv("STREAM_MAX_AGE", "120"))
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_TTL = int(os.getenv("CHART_CACHE_TTL", "3600"))
+LOOKUP_WORKERS = int(os.getenv("LOOKUP_WORKERS", "8"))
+MULTI_SYMBOL_LIMIT = 10
+CHAT_LOCK_STRIPES = 64
+
+analyst_ratings = AnalystRatings(ttl=ANALYST_RATINGS_TTL)
+history_store = HistoryStore(HISTORY_DIR, refresh_interval=HISTORY_REFRESH, keep_days=HISTORY_KEEP_DAYS)
+
+http = requests.Session()
+http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=UPDATE_WORKERS + 4))
+
+chart_renderer = ChartRenderer(workers=CHART_WORKERS)
+atexit.register(chart_renderer.close)
+chart_cache = ChartCache(ttl=CHART_CACHE_TTL)
+lookup_pool = ThreadPoolExecutor(max_workers=LOOKUP_WORKERS, thread_name_prefix="lookup")
+
+alerts_triggered = registry.counter("alerts_triggered_total", "Tetiklenen fiyat alarmları")
+broadcast_results = registry.counter("broadcast_messages_total", "Toplu gönderim sonuçları")
+broadcast_retries = registry.counter("telegram_retries_total", "Toplu gönderimde tekrar denenen mesajlar")
+broadcast_rate_limited = registry.counter("telegram_rate_limited_total", "Telegram'dan dönen 429 yanıtları")
+registry.counter("cache_requests_total", "Önbellek istekleri", collect=lambda: {
+    (("cache", "quote"), ("result", "hit")): quote_cache.hits,
+    (("cache", "quote"), ("result", "miss")): quote_cache.misses,
+    (("cache", "chart"), ("result", "hit")): chart_cache.hits,
+    (("cache", "chart"), ("result", "miss")): chart_cache.misses,
+})
+chat_locks = [threading.Lock() for _ in range(CHAT_LOCK_STRIPES)]
+seen_chat_ids = set()
+seen_chat_ids_lock = threading.Lock()
+price_feed = None
+streamed_symbols = {}
+streamed_tickers = {}
 
 assets = {
     '📈 BIST100': 'XU100.IS',
@@ -52,7 +131,7 @@ def setup_driver():
     opts.add_argument("--disable-dev-shm-usage")
     opts.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64)")
 
-    temp_profile = tempfile.mkdtemp()
+    temp_profile = tempfile.mkdtemp(prefix=PROFILE_PREFIX)
     opts.add_argument(f"--user-data-dir={temp_profile}")
 
     opts.add_experimental_option("prefs", {
@@ -63,6 +142,7 @@ def setup_driver():
     })
 
     driver = Chrome(options=opts)
+    driver.profile_dir = temp_profile
 
     driver.execute_cdp_cmd("Page.setDownloadBehavior", {
         "behavior": "allow",
@@ -72,12 +152,21 @@ def setup_driver():
     print("✅ Chrome başlatıldı, geçici profil:", temp_profile)
     return driver
 
+driver_pool = DriverPool(
+    setup_driver,
+    size=DRIVER_POOL_SIZE,
+    max_uses=DRIVER_MAX_USES,
+    checkout_timeout=DRIVER_CHECKOUT_TIMEOUT,
+)
+atexit.register(driver_pool.close)
+
+@timed(handler_latency, handler="download_excel")
 def download_excel(max_attempts=5, initial_wait=15, retry_wait=10):
     attempt = 1
     while attempt <= max_attempts:
         print(f"📥 Excel indirme denemesi {attempt}/{max_attempts}...")
         
-        with setup_driver() as driver:
+        with driver_pool.driver() as driver:
             driver.get("https://www.tefas.gov.tr/FonKarsilastirma.aspx")
             try:
                 btn = WebDriverWait(driver, 40).until(
@@ -112,15 +201,15 @@ def download_excel(max_attempts=5, initial_wait=15, retry_wait=10):
 
 
                 try:
-                    df = pd.read_excel(excel_file_path)
-                    if df.empty:
+                    fund_catalog.load(force=True)
+                    if not fund_catalog.row_count:
                         print("❌ Dosya içeriği boş. Tekrar deneniyor...")
                         attempt += 1
                         time.sleep(retry_wait)
                         continue
                     else:
                         print(f"✅ Excel başarıyla indirildi: {excel_file_path}")
-                        print(f"📊 Dosyada {len(df)} satır veri bulundu.")
+                        print(f"📊 Dosyada {fund_catalog.row_count} satır veri bulundu.")
                         return True
 
                 except Exception as e:
@@ -147,8 +236,8 @@ def check_excel_and_redownload():
         return
 
     try:
-        df = pd.read_excel(excel_file_path)
-        row_count = len(df)
+        fund_catalog.load()
+        row_count = fund_catalog.row_count
 
         if row_count < 10:
             print(f"🔔 Excel dosyasında {row_count} satır var (10'dan az). Tekrar indiriliyor...")
@@ -160,6 +249,21 @@ def check_excel_and_redownload():
         print(f"❌ Excel dosyası okunurken hata: {e}. Tekrar indiriliyor...")
         download_excel()
 
+def fetch_fon_info_selenium(kullanici_fon):
+    with driver_pool.driver() as driver:
+        driver.get(FUND_URL.format(kullanici_fon))
+
+        info = {}
+        for key, xpath in INFO_XPATHS.items():
+            try:
+                info[key] = WebDriverWait(driver, 20).until(
+                    EC.visibility_of_element_located((By.XPATH, xpath))
+                ).text
+            except Exception:
+                info[key] = MISSING
+        return info
+
+@timed(handler_latency, handler="fetch_fon_data")
 def fetch_fon_data(kullanici_fon, chat_id):
     if not os.path.exists(excel_file_path):
         print("Excel dosyası bulunamadı, indiriliyor...")
@@ -168,242 +272,223 @@ def fetch_fon_data(kullanici_fon, chat_id):
             return
 
     try:
-        fon_kodlari = pd.Series(pd.read_excel(excel_file_path).iloc[:, 0]).dropna().unique()[1:]
+        fund_catalog.load()
     except Exception as e:
         send_message(chat_id, f"Excel okuma hatası: {e}")
         return
 
-    if kullanici_fon not in fon_kodlari:
+    fund_row = fund_catalog.get(kullanici_fon)
+    if fund_row is None:
         send_message(chat_id, f"🔔 *{kullanici_fon}* fon kodu bulunamadı.")
         return
 
-    with setup_driver() as driver:
-        driver.get(f"https://www.tefas.gov.tr/FonAnaliz.aspx?FonKod={kullanici_fon}")
-        
-        xpaths = {
-            "Fiyat": '//*[@id="MainContent_PanelInfo"]/div[1]/ul[1]/li[1]/span',
-            "Günlük Getiri": '//*[@id="MainContent_PanelInfo"]/div[1]/ul[1]/li[2]/span',
-            "Yatırımcı Sayısı": '//*[@id="MainContent_PanelInfo"]/div[1]/ul[2]/li[2]/span',
-            "Fon Risk Seviyesi": '//*[@id="MainContent_DetailsViewFund"]/tbody/tr[15]/td[2]',
-            "Son 1 Ay Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[1]/span',
-            "Son 3 Ay Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[2]/span',
-            "Son 6 Ay Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[3]/span',
-            "Son 1 Yıl Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[4]/span'
-        }
-        
-        data = {"Fon Adı": kullanici_fon}
-        for key, xpath in xpaths.items():
-            try:
-                data[key] = WebDriverWait(driver, 20).until(
-                    EC.visibility_of_element_located((By.XPATH, xpath))
-                ).text
-            except Exception:
-                data[key] = "Bilgi alınamadı"
-
-        df = pd.DataFrame([data])
-        msg = f"*📈 Fon Bilgileri: {kullanici_fon}*\n\n"
-        for key, value in data.items():
-            if key != "Fon Adı":
-                msg += f"{key}: {value}\n"
-        send_message(chat_id, msg)
-
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-        'Accept-Language': 'tr-TR,tr;q=0.9',
-        'Referer': 'https://www.tefas.gov.tr/',
-    }
-    cookies = {
-        'ASP.NET_SessionId': 'xyz123',
-    }
+    info, df = None, None
+    if TEFAS_FETCH_MODE != "selenium":
+        try:
+            info, df = fetch_fund_page(http, kullanici_fon)
+        except Exception as e:
+            print(f"{kullanici_fon} fon sayfası alınamadı: {e}")
+    if info is None or all(value == MISSING for value in info.values()):
+        info = fetch_fon_info_selenium(kullanici_fon)
+
+    msg = f"*📈 Fon Bilgileri: {kullanici_fon}*\n\n"
+    for key, value in info.items():
+        msg += f"{key}: {value}\n"
+    returns = {key: value for key, value in fund_row.items() if isinstance(value, (int, float)) and not np.isnan(value)}
+    if returns:
+        try:
+            history = fund_catalog.history(kullanici_fon, days=2)
+        except Exception as e:
+            print(f"{kullanici_fon} fon geçmişi okunamadı: {e}")
+            history = []
+        previous = history[0] if len(history) == 2 else {}
+        msg += f"\n*Getiriler* (değişim: {previous['date']} verisine göre)\n" if previous else "\n*Getiriler*\n"
+        for key, value in returns.items():
+            before = previous.get(key)
+            if isinstance(before, (int, float)) and not np.isnan(before):
+                msg += f"{key}: {value:,.2f} ({value - before:+.2f})\n"
+            else:
+                msg += f"{key}: {value:,.2f}\n"
+    send_message(chat_id, msg)
 
     try:
-        with requests.get(f"https://www.tefas.gov.tr/FonAnaliz.aspx?FonKod={kullanici_fon}", headers=headers, cookies=cookies, timeout=10) as url:
-            data = url.content
-        soup = BeautifulSoup(data, features="html.parser")
-        js_text = soup.find_all('script', type="text/javascript")
-        
-        kacinci = None
-        for fiyat in range(len(js_text)):
-            if len(js_text[fiyat].contents) == 0:
-                continue
-            if js_text[fiyat].contents[0].find("chartMainContent_FonFiyatGrafik") > 0:
-                kacinci = fiyat
-                break
-        
-        if kacinci is None:
+        if df is None:
+            _, df = fetch_fund_page(http, kullanici_fon)
+        if df is None:
             send_message(chat_id, f"🔔 *{kullanici_fon}* için fiyat grafiği verisi bulunamadı.")
             return
 
-        tarih_rakam = js_text[kacinci].contents[0].split("categories")
-        tarih = tarih_rakam[1].split("]")[0].split("[")[1]
-        rakam = tarih_rakam[1].split("[")[4].split("]")[0]
-
-        df = pd.DataFrame(columns=["Tarih", "Fiyat"])
-        df["Tarih"] = tarih.split(",")
-        df["Fiyat"] = rakam.split(",")
-
-        df["Tarih"] = df["Tarih"].str.replace('"', '')
-        df["Fiyat"] = df["Fiyat"].str.replace('"', '')
-
-        df["Tarih"] = pd.to_datetime(df["Tarih"], format="%d.%m.%Y")
-        df["Fiyat"] = pd.to_numeric(df["Fiyat"], errors='coerce')
-
-        plt.figure(figsize=(10, 6))
-        plt.plot(df["Tarih"], df["Fiyat"], label="Fiyat")
-        plt.title(f"{kullanici_fon} - Fiyat Grafiği")
-        plt.xlabel("Tarih")
-        plt.ylabel("Fiyat")
-        plt.legend()
-
-        image_path = f"fon_chart_{kullanici_fon}.png"
-        plt.savefig(image_path, bbox_inches="tight", dpi=200)
-        plt.close()
-
-        send_photo(chat_id, image_path, f"*{kullanici_fon}* 1 Yıllık Fiyat Grafiği")
-
-        if os.path.exists(image_path):
-            os.remove(image_path)
+        send_chart(
+            chat_id,
+            ("fund", kullanici_fon),
+            df["Tarih"].iloc[-1],
+            f"*{kullanici_fon}* 1 Yıllık Fiyat Grafiği",
+            lambda: chart_renderer.render(render_fund_chart, kullanici_fon, df),
+        )
 
     except Exception as e:
         send_message(chat_id, f"🔔 *{kullanici_fon}* için fiyat grafiği oluşturulurken hata: {e}")
         print(f"Fiyat grafiği hatası: {e}")
 
 def load_users():
-    try:
-        response = supabase.table("users").select("chat_id").eq("is_active", True).execute()
-        return [user["chat_id"] for user in response.data]
-    except Exception as e:
-        print(f"Kullanıcılar yüklenirken hata: {e}")
-        return []
+    return repository.active_users()
 
 def save_user(chat_id):
-    try:
-        existing = supabase.table("users").select("chat_id").eq("chat_id", chat_id).execute()
-        if existing.data:
-            supabase.table("users").update({"is_active": True}).eq("chat_id", chat_id).execute()
-        else:
-            supabase.table("users").insert({"chat_id": chat_id, "is_active": True}).execute()
-        supabase.table("user_logs").insert({
-            "chat_id": chat_id,
-            "action": "joined"
-        }).execute()
-    except Exception as e:
-        print(f"Kullanıcı {chat_id} kaydedilirken hata: {e}")
+    repository.activate_user(chat_id)
 
 def deactivate_user(chat_id):
-    try:
-        supabase.table("users").update({"is_active": False}).eq("chat_id", chat_id).execute()
-        supabase.table("user_logs").insert({
-            "chat_id": chat_id,
-            "action": "left"
-        }).execute()
-    except Exception as e:
-        print(f"Kullanıcı {chat_id} pasif yapılırken hata: {e}")
+    repository.deactivate_user(chat_id)
 
 def load_portfolios():
-    portfolios = {}
-    try:
-        result = supabase.table("portfolios").select("chat_id", "symbol", "quantity", "avg_price").execute()
-        for row in result.data:
-            chat_id = str(row["chat_id"])
-            if chat_id not in portfolios:
-                portfolios[chat_id] = []
-            portfolios[chat_id].append({
-                "symbol": row["symbol"],
-                "quantity": row["quantity"],
-                "avg_price": row["avg_price"]
-            })
-    except Exception as e:
-        print(f"Portföyler yüklenirken hata: {e}")
-    return portfolios
+    return repository.portfolios()
 
 def save_portfolio(chat_id, portfolio):
-    try:
-        supabase.table("portfolios").delete().eq("chat_id", chat_id).execute()
-        for item in portfolio:
-            supabase.table("portfolios").insert({
-                "chat_id": chat_id,
-                "symbol": item["symbol"],
-                "quantity": item["quantity"],
-                "avg_price": item["avg_price"]
-            }).execute()
-    except Exception as e:
-        print(f"{chat_id} için portföy kaydedilirken hata: {e}")
+    repository.save_portfolio(chat_id, portfolio)
+    sync_stream_symbols()
 
-def get_and_save_chat_ids():
-    url = f"https://api.telegram.org/bot{TOKEN}/getUpdates"
-    try:
-        response = requests.get(url).json()
-        for result in response.get("result", []):
-            try:
-                chat_id = result["message"]["chat"]["id"]
-                save_user(chat_id)
-            except Exception:
-                continue
-    except Exception as e:
-        print(f"Chat ID'ler alınırken hata: {e}")
+def remember_chat(chat_id, text):
+    with seen_chat_ids_lock:
+        if text.lower() == "/stop":
+            seen_chat_ids.discard(chat_id)
+        else:
+            seen_chat_ids.add(chat_id)
+
+def save_seen_chat_ids():
+    with seen_chat_ids_lock:
+        chat_ids = list(seen_chat_ids)
+        seen_chat_ids.clear()
+    for chat_id in chat_ids:
+        if repository.is_active(chat_id):
+            continue
+        try:
+            save_user(chat_id)
+        except Exception as e:
+            print(f"{chat_id} kaydedilirken hata: {e}")
 
-def save_alert(chat_id, symbol, target_price):
-    try:
-        supabase.table("alerts").insert({
-            "chat_id": chat_id,
-            "symbol": symbol.upper(),
-            "target_price": float(target_price)
-        }).execute()
-    except Exception as e:
-        print(f"Alarm kaydedilirken hata: {e}")
+def save_alert(chat_id, symbol, target_price, percent=None, price=None):
+    repository.add_alert(chat_id, symbol, target_price, percent, price)
+    sync_stream_symbols()
 
 def remove_alert(chat_id, symbol):
-    try:
-        supabase.table("alerts").delete().eq("chat_id", chat_id).eq("symbol", symbol.upper()).execute()
-    except Exception as e:
-        print(f"Alarm silinirken hata: {e}")
+    repository.remove_alert(chat_id, symbol)
+    sync_stream_symbols()
+
+def delete_alert(alert):
+    repository.delete_alert(alert)
+    sync_stream_symbols()
 
 def get_alerts(chat_id):
+    return repository.alerts(chat_id)
+
+def alert_message(symbol_full, alert, current_price):
+    if alert.get("percent"):
+        reference = alert["target_price"]
+        change = (current_price - reference) / reference * 100
+        return (
+            f"🔔 *{symbol_full}* %{alert['percent']:g} hareket etti!\n"
+            f"Referans: {reference:,.2f}\n"
+            f"Şu anki fiyat: {current_price:,.2f} ({change:+.2f}%)"
+        )
+    return (
+        f"🔔 *{symbol_full}* hedef fiyata ulaştı!\n"
+        f"Hedef: {alert['target_price']:,.2f}\n"
+        f"Şu anki fiyat: {current_price:,.2f}"
+    )
+
+def notify_alerts(symbol, symbol_full, current_price):
+    for alert in repository.alert_index.update(symbol, current_price):
+        chat_id = alert["chat_id"]
+        if not repository.is_active(chat_id):
+            continue
+        try:
+            send_message(chat_id, alert_message(symbol_full, alert, current_price))
+            alerts_triggered.inc()
+            delete_alert(alert)
+            print(f"✅ {chat_id} için {symbol} alarmı tetiklendi ve silindi.")
+        except Exception as e:
+            print(f"{symbol} alarm kontrolünde hata: {e}")
+
+def on_price_tick(ticker, price):
+    quote_cache.put(ticker, price)
+    for symbol in streamed_tickers.get(ticker, ()):
+        notify_alerts(symbol, ticker, price)
+
+def sync_stream_symbols():
+    global streamed_symbols, streamed_tickers
+    if price_feed is None:
+        return
+    symbols = set(repository.alert_symbols())
+    symbols.update(item["symbol"] for items in repository.portfolios().values() for item in items)
     try:
-        response = supabase.table("alerts").select("symbol", "target_price").eq("chat_id", chat_id).execute()
-        return response.data
+        resolved = resolve_symbols(symbols)
     except Exception as e:
-        print(f"Alarmlar alınırken hata: {e}")
-        return []
+        print(f"Canlı akış sembolleri çözümlenirken hata: {e}")
+        return
+    tickers = {}
+    for symbol, ticker in resolved.items():
+        tickers.setdefault(ticker, []).append(symbol)
+    streamed_symbols, streamed_tickers = resolved, tickers
+    price_feed.set_symbols(tickers)
+
+def start_price_feed():
+    global price_feed
+    if PRICE_FEED == "poll":
+        return
+    try:
+        if PRICE_FEED.startswith("replay:"):
+            feed = ReplayFeed.from_csv(on_price_tick, PRICE_FEED[len("replay:"):])
+        else:
+            feed = YahooStreamFeed(on_price_tick)
+    except Exception as e:
+        print(f"Canlı fiyat akışı başlatılamadı, periyodik kontrol kullanılacak: {e}")
+        return
+    price_feed = feed
+    sync_stream_symbols()
+    price_feed.start()
 
+def is_streamed(symbol):
+    ticker = streamed_symbols.get(symbol)
+    return price_feed is not None and ticker is not None and price_feed.is_fresh(ticker, STREAM_MAX_AGE)
+
+@timed(handler_latency, handler="check_alerts")
 def check_alerts():
     print(f"🔍 Alarm kontrolü başladı - {datetime.now().strftime('%H:%M:%S')}")
-    users = load_users()
-    for chat_id in users:
-        alerts = get_alerts(chat_id)
-        if not alerts:
+    symbols = [symbol for symbol in repository.alert_symbols() if not is_streamed(symbol)]
+    if not symbols:
+        return
+
+    try:
+        prices = get_quotes(symbols)
+    except Exception as e:
+        print(f"Alarm fiyatları alınırken hata: {e}")
+        return
+
+    for symbol in symbols:
+        if symbol not in prices:
+            print(f"{symbol} alarm kontrolünde hata: fiyat alınamadı")
             continue
-        for alert in alerts:
-            symbol = alert["symbol"]
-            target_price = alert["target_price"]
-            try:
-                t, symbol_full = fetch_ticker(symbol)
-                current_price = t.fast_info.get("lastPrice", None)
-                if current_price is None:
-                    continue
-                if abs(current_price - target_price) <= 0.01:
-                    send_message(
-                        chat_id,
-                        f"🔔 *{symbol_full}* hedef fiyata ulaştı!\n"
-                        f"Hedef: {target_price:,.2f}\n"
-                        f"Şu anki fiyat: {current_price:,.2f}"
-                    )
-                    remove_alert(chat_id, symbol)
-                    print(f"✅ {chat_id} için {symbol} alarmı tetiklendi ve silindi.")
-            except Exception as e:
-                print(f"{symbol} alarm kontrolünde hata: {e}")
+        notify_alerts(symbol, *prices[symbol])
 
-def send_message(chat_id, message):
-    url = f"https://api.telegram.org/bot{TOKEN}/sendMessage"
+    print(f"✅ Alarm kontrolü bitti: {len(symbols)} sembol, {len(prices)} fiyat alındı.")
+
+def post_message(chat_id, message):
+    url = f"{TELEGRAM_API_URL}/bot{TOKEN}/sendMessage"
     payload = {
         "chat_id": chat_id,
         "text": message,
         "parse_mode": "Markdown"
     }
     try:
-        response = requests.post(url, json=payload)
-        if not response.ok:
+        with external_calls.time(target="telegram", method="sendMessage"):
+            return http.post(url, json=payload, timeout=30)
+    except Exception as e:
+        print(f"Mesaj gönderilirken hata: {e}")
+        return None
+
+def send_message(chat_id, message):
+    try:
+        response = post_message(chat_id, message)
+        if response is not None and response.status_code >= 400:
             error_desc = response.json().get('description', '').lower()
             if 'bot was blocked' in error_desc or 'chat not found' in error_desc:
                 deactivate_user(chat_id)
@@ -413,444 +498,510 @@ def send_message(chat_id, message):
         print(f"Mesaj gönderilirken hata: {e}")
         return None
 
-def send_photo(chat_id, image_path, caption=""):
-    url = f"https://api.telegram.org/bot{TOKEN}/sendPhoto"
+broadcaster = Broadcaster(post_message, deactivate_user, rate=BROADCAST_RATE, workers=BROADCAST_WORKERS)
+
+def send_photo(chat_id, image, caption=""):
+    url = f"{TELEGRAM_API_URL}/bot{TOKEN}/sendPhoto"
+    data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': 'Markdown'}
     try:
-        with open(image_path, "rb") as photo:
-            files = {'photo': photo}
-            data = {'chat_id': chat_id, 'caption': caption, 'parse_mode': 'Markdown'}
-            requests.post(url, files=files, data=data)
+        with external_calls.time(target="telegram", method="sendPhoto"):
+            if isinstance(image, str):
+                data['photo'] = image
+                return http.post(url, data=data, timeout=60)
+            files = {'photo': ("chart.png", image, "image/png")}
+            return http.post(url, files=files, data=data, timeout=60)
     except Exception as e:
         print(f"{chat_id}'e resim gönderilirken hata: {e}")
+        return None
 
-def fetch_ticker(symbol):
-    if "." not in symbol:
-        try:
-            ticker = yf.Ticker(symbol + ".IS")
-            _ = ticker.fast_info["lastPrice"]
-            return ticker, symbol + ".IS"
-        except Exception:
-            pass
-    ticker = yf.Ticker(symbol)
-    return ticker, symbol
-
-def send_live_visualization(chat_id, user_portfolio):
-
-    df = pd.DataFrame(user_portfolio)
-    df['current_price'] = df['symbol'].apply(
-        lambda sym: fetch_ticker(sym)[0].fast_info.get("lastPrice", 0)
-    )
-    df['cost']  = df['quantity'] * df['avg_price']
-    df['value'] = df['quantity'] * df['current_price']
-    df['pnl']   = df['value'] - df['cost']
-
-    total_cost  = df['cost'].sum()
-    total_value = df['value'].sum()
-    total_pnl   = df['pnl'].sum()
-    total_roi   = (total_pnl / total_cost * 100) if total_cost else 0
-
-    sns.set_style('whitegrid')
-    colors = sns.color_palette('tab20', n_colors=len(df))
-
-    height = max(6, len(df) * 0.4)
-    fig, ax = plt.subplots(figsize=(8, height))
-
-    wedges, texts, autotexts = ax.pie(
-        df['value'],
-        labels=None,
-        startangle=90,
-        colors=colors,
-        wedgeprops={'edgecolor':'white', 'linewidth':1},
-        pctdistance=0.75,
-        autopct=lambda pct: f"{pct:.1f}%" if pct > 1 else ""
-    )
-
-    labels = [
-        f"{sym} ({int(q)} adet)\nK/Z: {pnl:,.2f} ({(pnl/cost*100):+.2f}%)"
-        for sym, q, pnl, cost in zip(
-            df['symbol'], df['quantity'], df['pnl'], df['cost']
-        )
-    ]
-    ax.legend(
-        wedges,
-        labels,
-        title="Portföyünüz",
-        bbox_to_anchor=(1, 0.5),
-        loc="center left",
-        fontsize=10
-    )
-
-    centre_circle = plt.Circle((0, 0), 0.60, fc='white')
-    ax.add_artist(centre_circle)
-    ax.axis('equal')
-    ax.set_title('Portföy Dağılımı', pad=20)
-
-    plt.subplots_adjust(left=0.0, right=0.75, bottom=0.25)
-
-    table_data = [[
-        f"{total_cost:,.2f}",
-        f"{total_value:,.2f}",
-        f"{total_pnl:,.2f} ({total_roi:+.2f}%)"
-    ]]
-    col_labels = ["Maliyet", "Değer", "Kâr/Zarar"]
-    table = ax.table(
-        cellText=table_data,
-        colLabels=col_labels,
-        cellLoc='center',
-        loc='bottom',
-        bbox=[0.0, -0.22, 0.75, 0.15] 
-    )
-    table.auto_set_font_size(False)
-    table.set_fontsize(10)
+def photo_file_id(response):
+    try:
+        return response.json()["result"]["photo"][-1]["file_id"]
+    except Exception:
+        return None
 
-    plt.tight_layout()
+def send_chart(chat_id, key, data_date, caption, render):
+    if data_date is None:
+        image = render()
+        if image is not None:
+            send_photo(chat_id, image, caption)
+        return
 
-    image_path = os.path.join(download_dir, f"live_portfolio_{chat_id}.png")
-    plt.savefig(image_path, bbox_inches="tight", dpi=150)
-    plt.close(fig)
-    send_photo(chat_id, image_path, caption="*📊 Canlı Portföy Görseliniz*")
-    os.remove(image_path)
+    with chart_cache.key_lock(key):
+        file_id = chart_cache.get(key, data_date)
+        if file_id:
+            response = send_photo(chat_id, file_id, caption)
+            if response is not None and response.status_code < 400:
+                return
+            chart_cache.invalidate(key)
 
+        image = render()
+        if image is None:
+            return
+        response = send_photo(chat_id, image, caption)
+        if response is not None and response.status_code < 400:
+            chart_cache.put(key, data_date, photo_file_id(response))
 
+def send_live_visualization(chat_id, user_portfolio):
+    quotes = get_quotes(item["symbol"] for item in user_portfolio)
+    valuation = value_portfolio(user_portfolio, {symbol: price for symbol, (_, price) in quotes.items()})
+    image = chart_renderer.render(render_portfolio_chart, valuation)
+    send_photo(chat_id, image, caption="*📊 Canlı Portföy Görseliniz*")
+    if valuation.missing:
+        send_message(chat_id, f"Fiyatı alınamayan semboller: {', '.join(valuation.missing)}")
+
+
+def format_change_line(name, hist):
+    current_price = hist.iloc[-1]
+    if len(hist) >= 2:
+        prev_close = hist.iloc[-2]
+        change = ((current_price - prev_close) / prev_close) * 100
+        emoji = "🟢" if change > 0 else "🔴" if change < 0 else "⚪️"
+        return f"{name}: {current_price:,.2f} ({emoji} {change:+.2f}%)\n"
+    return f"{name}: {current_price:,.2f} (⚪️ Değişim yok)\n"
+
+@timed(handler_latency, handler="send_market_summary_to_all")
 def send_market_summary_to_all():
     print(f"📤 Gönderim başladı - {datetime.now().strftime('%H:%M:%S')}")
-    get_and_save_chat_ids()
+    save_seen_chat_ids()
     users = load_users()
     portfolios = load_portfolios()
 
+    symbols = {item["symbol"] for chat_id in users for item in portfolios.get(str(chat_id), [])}
+    include_assets = any(not portfolios.get(str(chat_id)) for chat_id in users)
+    try:
+        tickers = resolve_symbols(symbols)
+        exact = list(assets.values()) if include_assets else []
+        series = history_store.closes(list(tickers.values()) + exact)
+        closes = {symbol: (ticker, series[ticker]) for symbol, ticker in tickers.items() if ticker in series}
+        closes.update((ticker, (ticker, series[ticker])) for ticker in exact if ticker in series)
+    except Exception as e:
+        print(f"Piyasa özeti verisi alınırken hata: {e}")
+        closes = {}
+    print(f"📊 Özet verisi hazır: {len(closes)} sembol, {len(users)} kullanıcı")
+    valuations = value_portfolios(
+        {str(chat_id): portfolios.get(str(chat_id), []) for chat_id in users},
+        {symbol: float(hist.iloc[-1]) for symbol, (_, hist) in closes.items()},
+    )
+
+    header = f"*📊 Günlük Piyasa Özeti - {datetime.now():%d.%m.%Y}*\n\n"
+    messages = []
     for chat_id in users:
         chat_portfolio = portfolios.get(str(chat_id), [])
-        msg = f"*📊 Günlük Piyasa Özeti - {datetime.now():%d.%m.%Y}*\n\n"
+        msg = header
 
         if chat_portfolio:
             msg += "*Portföyünüz:*\n"
             for item in chat_portfolio:
                 symbol = item["symbol"]
-                try:
-                    t, symbol_full = fetch_ticker(symbol)
-                    hist = t.history(period="5d", interval="1d")["Close"].dropna()
-                    hist.index = pd.to_datetime(hist.index.date)
-                    hist = hist[~hist.index.duplicated(keep="last")]
-
-                    if len(hist) >= 2:
-                        current_price = hist.iloc[-1]
-                        prev_close = hist.iloc[-2]
-                        change = ((current_price - prev_close) / prev_close) * 100
-                        emoji = "🟢" if change > 0 else "🔴" if change < 0 else "⚪️"
-                        msg += f"{symbol_full}: {current_price:,.2f} ({emoji} {change:+.2f}%)\n"
-                    else:
-                        current_price = hist.iloc[-1]
-                        msg += f"{symbol_full}: {current_price:,.2f} (⚪️ Değişim yok)\n"
-                except Exception as e:
+                if symbol in closes:
+                    symbol_full, hist = closes[symbol]
+                    msg += format_change_line(symbol_full, hist)
+                else:
                     msg += f"{symbol}: Veri alınamadı\n"
-                    print(f"{symbol} için hata: {str(e)}")
+            valuation = valuations[str(chat_id)]
+            if not valuation.missing:
+                msg += (
+                    f"\n💼 Portföy değeri: {valuation.total_value:,.2f} "
+                    f"(K/Z: {valuation.total_pnl:,.2f}, {valuation.total_roi:+.2f}%)\n"
+                )
         else:
             msg += "*Piyasa Özeti:*\n"
             for name, symbol in assets.items():
-                try:
-                    t = yf.Ticker(symbol)
-                    hist = t.history(period="5d", interval="1d")["Close"].dropna()
-                    hist.index = pd.to_datetime(hist.index.date)
-                    hist = hist[~hist.index.duplicated(keep="last")]
-
-                    if len(hist) >= 2:
-                        current_price = hist.iloc[-1]
-                        prev_close = hist.iloc[-2]
-                        change = ((current_price - prev_close) / prev_close) * 100
-                        emoji = "🟢" if change > 0 else "🔴" if change < 0 else "⚪️"
-                        msg += f"{name}: {current_price:,.2f} ({emoji} {change:+.2f}%)\n"
-                    else:
-                        current_price = hist.iloc[-1]
-                        msg += f"{name}: {current_price:,.2f} (⚪️ Değişim yok)\n"
-                except Exception as e:
+                if symbol in closes:
+                    msg += format_change_line(name, closes[symbol][1])
+                else:
                     msg += f"{name}: Veri alınamadı\n"
-                    print(f"{symbol} için hata: {str(e)}")
 
-        send_message(chat_id, msg)
-        print(f"✅ Mesaj gönderildi: {chat_id}")
+        messages.append((chat_id, msg))
 
-def process_user_requests(last_update_id):
-    url = f"https://api.telegram.org/bot{TOKEN}/getUpdates"
-    params = {'offset': last_update_id} if last_update_id else {}
-    try:
-        updates = requests.get(url, params=params).json().get("result", [])
-    except Exception as e:
-        print(f"Güncellemeler alınırken hata: {e}")
-        return last_update_id
-
-    if not updates:
-        return last_update_id
+    report = broadcaster.run(messages)
+    for result in ("sent", "failed", "deactivated"):
+        broadcast_results.inc(getattr(report, result), result=result)
+    broadcast_retries.inc(report.retries)
+    broadcast_rate_limited.inc(report.rate_limited)
+    print(f"✅ Piyasa özeti gönderildi - {report}")
 
-    portfolios = load_portfolios()
+def get_updates(offset=None, timeout=0):
+    url = f"{TELEGRAM_API_URL}/bot{TOKEN}/getUpdates"
+    params = {
+        "timeout": timeout,
+        "allowed_updates": json.dumps(["message"]),
+    }
+    if offset:
+        params["offset"] = offset
+    with external_calls.time(target="telegram", method="getUpdates"):
+        response = http.get(url, params=params, timeout=timeout + 10)
+    return response.json().get("result", [])
 
-    fon_kodlari = []
-    if os.path.exists(excel_file_path):
+def poll_updates(update_queue, last_update_id):
+    while True:
         try:
-            fon_kodlari = pd.Series(pd.read_excel(excel_file_path).iloc[:, 0]).dropna().unique()[1:]
+            updates = get_updates(last_update_id, timeout=POLL_TIMEOUT)
         except Exception as e:
-            print(f"Excel okuma hatası (fon kodları): {e}")
+            print(f"Güncellemeler alınırken hata: {e}")
+            time.sleep(3)
+            continue
+
+        for update in updates:
+            last_update_id = update["update_id"] + 1
+            update_queue.put(update)
 
-    for update in updates:
-        last_update_id = update["update_id"] + 1
+def get_chat_lock(chat_id):
+    return chat_locks[hash(chat_id) % len(chat_locks)]
+
+def update_worker(update_queue):
+    while True:
+        update = update_queue.get()
         try:
-            if "message" not in update:
-                continue 
+            chat_id = update.get("message", {}).get("chat", {}).get("id")
+            with get_chat_lock(chat_id):
+                handle_update(update)
+        except Exception as e:
+            print(f"Hata (update_id: {update.get('update_id')}): {e}")
+        finally:
+            update_queue.task_done()
+
+def start_update_workers(last_update_id):
+    update_queue = queue.Queue()
+    registry.gauge("update_queue_depth", "İşlenmeyi bekleyen güncellemeler", collect=update_queue.qsize)
+    threading.Thread(target=poll_updates, args=(update_queue, last_update_id), name="poller", daemon=True).start()
+    for i in range(UPDATE_WORKERS):
+        threading.Thread(target=update_worker, args=(update_queue,), name=f"worker-{i}", daemon=True).start()
+    print(f"🟢 Long polling başladı ({UPDATE_WORKERS} işçi, {POLL_TIMEOUT} sn timeout)")
+    return update_queue
+
+def lookup_symbol(symbol):
+    ticker = indexed_ticker(symbol)
+    quote_future = lookup_pool.submit(get_quote, symbol)
+    ratings_future = lookup_pool.submit(analyst_ratings.get, symbol)
+    history_future = lookup_pool.submit(history_store.history, ticker) if ticker else None
+
+    quote = quote_future.result()
+    if quote is None:
+        history = None
+    elif history_future is None or quote[0] != ticker:
+        history = history_store.history(quote[0])
+    else:
+        history = history_future.result()
+    return quote, history, ratings_future
+
+def send_analyst_ratings(chat_id, code, price, öneri_df):
+    if öneri_df is None or öneri_df.empty:
+        return
 
-            chat_id = update["message"]["chat"]["id"]
-            text = update["message"].get("text", "").strip()
-            if not text:
-                continue
+    if price:
+        öneri_df.loc[:, "Son Fiyat"] = round(price, 2)
+        öneri_df.loc[:, "Getiri Potansiyeli"] = (öneri_df["Fiyat Hedefi"].astype(float) - price).round(2)
+        öneri_df.loc[:, "Getiri Potansiyeli (%)"] = (öneri_df["Getiri Potansiyeli"] / price * 100).round(2).astype(str) + "%"
+        columns = ["Hisse Kodu", "Kurum", "Öneri", "Öneri Tarihi", "Fiyat Hedefi", "Son Fiyat", 
+                "Getiri Potansiyeli", "Getiri Potansiyeli (%)", "Model Portföy"]
+        öneri_df = öneri_df[columns]
+    else:
+        öneri_df.loc[:, "Son Fiyat"] = "Veri yok"
+        öneri_df.loc[:, "Getiri Potansiyeli"] = "Veri yok"
+        öneri_df.loc[:, "Getiri Potansiyeli (%)"] = "Veri yok"
+
+    image = chart_renderer.render(render_table, öneri_df)
+    send_photo(chat_id, image, f"🔎 *{code} için Analist Önerileri*")
+
+def send_symbol_info(chat_id, code):
+    quote, history, ratings_future = lookup_symbol(code)
+    symbol, price = quote if quote is not None else (code, None)
+    closes = history["Close"] if history is not None and not history.empty else None
+    data_date = closes.index[-1].date() if closes is not None else None
+
+    if quote is None:
+        send_message(chat_id, f"{symbol}: Veri alınamadı")
+    elif closes is not None and len(closes) >= 2:
+        change = ((price - closes.iloc[-2]) / closes.iloc[-2]) * 100
+        emoji = "🟢" if price > closes.iloc[-2] else "🔴" if price < closes.iloc[-2] else "⚪️"
+        send_message(chat_id, f"{symbol}: {price:,.2f} ({emoji} {change:+.2f}%)")
+    else:
+        send_message(chat_id, f"{symbol}: {price:,.2f} (⚪️)")
 
-            if text.lower() == "/start":
-                save_user(chat_id)
-                send_message(chat_id, "*📈 Hoş Geldiniz!*\n\n"
-                    "Bu bot ile hisse senedi, fon ve piyasa verilerini takip edebilirsiniz.\n"
-                    "- Günlük piyasa özetleri için 09:00 ve 15:00 saatlerinde bildirim alırsınız.\n"
-                    "- Bir hisse sembolü (örneğin: BIMAS) veya fon kodu (örneğin: TLY) yazarak anlık fiyatını, analizlerini ve grafiğini görüntüleyebilirsiniz.\n"
-                    "- /add <hisse> <adet> ile portföyünüze hisse ekleyebilir,\n"
-                    "- /remove <hisse> ile котороеportföyünüzden çıkarabilir,\n"
-                    "- /portfoy ile portföyünüzü görebilir,\n"
-                    "- /stop ile bildirimleri durdurabilirsiniz.\n"
-                    "- /live ile portföy hisse ve kripto paralarınızın canlı fiyatlarını, düne göre değişimlerini ve kâr/zararınızı görebilirsiniz.\n"
-                    "- /alert <hisse> <fiyat> ile hedef fiyat alarmı oluşturabilirsiniz.\n"
-                    "- /remove\\_alert <hisse> ile hedef fiyat alarmını kaldırabilirsiniz.\n"
-                    "- /alert\\_list ile aktif alarmlarınızı görebilirsiniz.\n\n"
-                )
-                print(f"✅ Yeni kullanıcı: {chat_id}")
-                continue
+    try:
+        send_analyst_ratings(chat_id, code, price, ratings_future.result())
+    except Exception as e:
+        print(f"Fintables veri hatası: {e}")
 
-            if text.lower() == "/stop":
-                deactivate_user(chat_id)
-                send_message(chat_id, "*📉 Bildirimler durduruldu.*\n"
-                    "Tekrar bildirim almak için /start komutunu kullanabilirsiniz.")
-                print(f"❌ Kullanıcı bildirimleri durdurdu: {chat_id}")
-                continue
+    if closes is None:
+        return
+    send_chart(
+        chat_id,
+        ("ma", symbol),
+        data_date,
+        f"{symbol} 1 Yıllık Grafiği",
+        lambda: chart_renderer.render(render_ma_chart, symbol, history[["Close"]]),
+    )
 
-            if text.lower().startswith("/add "):
-                try:
-                    parts = text.split()
-                    if len(parts) != 3:
-                        send_message(chat_id, "Lütfen doğru formatta girin: /add HİSSE ADET")
-                        continue
-                    ticker_to_add = parts[1].strip().upper()
-                    quantity = float(parts[2].strip())
-                    if quantity <= 0:
-                        send_message(chat_id, "Adet pozitif bir sayı olmalıdır.")
-                        continue
+def send_symbols_overview(chat_id, codes):
+    codes = list(dict.fromkeys(codes))[:MULTI_SYMBOL_LIMIT]
+    for code in codes:
+        if code in fund_catalog:
+            try:
+                fetch_fon_data(code, chat_id)
+            except Exception as e:
+                print(f"{code} fon verisi alınırken hata: {e}")
+    codes = [code for code in codes if code not in fund_catalog]
+    if not codes:
+        return
 
-                    t, symbol_full = fetch_ticker(ticker_to_add)
-                    current_price = t.fast_info.get("lastPrice", None)
-                    if current_price is None:
-                        send_message(chat_id, f"🔔 *{ticker_to_add}* bulunamadı.")
-                        continue
+    quotes = get_quotes(codes)
+    histories = history_store.histories([ticker for ticker, _ in quotes.values()])
+    found = [code for code in codes if code in quotes and quotes[code][0] in histories]
+    missing = [code for code in codes if code not in found]
+    if not found:
+        send_message(chat_id, f"{', '.join(missing)}: Veri alınamadı")
+        return
 
-                    portfolios.setdefault(str(chat_id), [])
-                    existing_stock = next((item for item in portfolios[str(chat_id)] if item["symbol"] == ticker_to_add), None)
-
-                    if existing_stock:
-                        old_quantity = existing_stock["quantity"]
-                        old_avg_price = existing_stock["avg_price"]
-                        new_quantity = old_quantity + quantity
-                        new_avg_price = ((old_quantity * old_avg_price) + (quantity * current_price)) / new_quantity
-                        existing_stock["quantity"] = new_quantity
-                        existing_stock["avg_price"] = new_avg_price
-                        send_message(chat_id, f"✅ *{ticker_to_add}* portföyünüze eklendi.\n"
-                                             f"Yeni adet: {new_quantity}, Ortalama fiyat: {new_avg_price:,.2f}")
-                    else:
-                        portfolios[str(chat_id)].append({
-                            "symbol": ticker_to_add,
-                            "quantity": quantity,
-                            "avg_price": current_price
-                        })
-                        send_message(chat_id, f"✅ *{ticker_to_add}* portföyünüze eklendi.\n"
-                                             f"Adet: {quantity}, Alış fiyatı: {current_price:,.2f}")
-
-                    save_portfolio(chat_id, portfolios[str(chat_id)])
-                except ValueError:
-                    send_message(chat_id, "Lütfen geçerli bir adet girin.")
-                except Exception as e:
-                    send_message(chat_id, f"🔔 *{ticker_to_add}* eklenirken hata: {e}")
-                continue
+    prices = {}
+    for code in found:
+        prices.setdefault(*quotes[code])
+    names, matrix = stack_closes({ticker: histories[ticker]["Close"] for ticker in prices})
+    last_rsi = rsi(matrix)[:, -1]
+    last_ma50 = sma(matrix, 50)[:, -1]
+    last_vol = volatility(matrix)[:, -1]
+
+    lines = [f"{'Sembol':<10}{'Fiyat':>10}{'Gün %':>8}{'RSI':>6}{'MA50 %':>8}{'Vol %':>7}"]
+    for i, ticker in enumerate(names):
+        closes = matrix[i][~np.isnan(matrix[i])]
+        price = prices[ticker]
+        change = (price / closes[-2] - 1) * 100 if len(closes) >= 2 else 0.0
+        ma_gap = (price / last_ma50[i] - 1) * 100 if not np.isnan(last_ma50[i]) else np.nan
+        lines.append(
+            f"{ticker:<10}{price:>10,.2f}{change:>+8.2f}{last_rsi[i]:>6.0f}{ma_gap:>+8.1f}{last_vol[i] * 100:>7.1f}"
+        )
+    msg = "*📊 Karşılaştırma*\n```\n" + "\n".join(lines) + "\n```"
+    if missing:
+        msg += f"\nVeri alınamadı: {', '.join(missing)}"
+    send_message(chat_id, msg)
 
-            if text.lower() == "/live":
-                user_portfolio = portfolios.get(str(chat_id), [])
-                if user_portfolio:
-                    send_live_visualization(chat_id, user_portfolio)
-                else:
-                    send_message(chat_id, "Portföyünüz boş. /add <hisse> <adet> ile ekleyebilirsiniz.")
-                continue
+    series = {ticker: histories[ticker]["Close"] for ticker in names}
+    image = chart_renderer.render(render_comparison_chart, series)
+    send_photo(chat_id, image, f"{', '.join(names)} 1 Yıllık Karşılaştırma")
 
+COMMANDS = {"/start", "/stop", "/add", "/remove", "/portfoy", "/live", "/alert", "/remove_alert", "/alert_list"}
 
-            if text.lower().startswith("/remove "):
-                ticker_to_remove = text[8:].strip().upper()
-                
-                current_portfolio = load_portfolios().get(str(chat_id), [])
-                
-                if not current_portfolio:
-                    send_message(chat_id, f"🔔 *{ticker_to_remove}* portföyünüzde bulunamadı.")
-                    continue
-                
-                updated_portfolio = [item for item in current_portfolio if item["symbol"] != ticker_to_remove]
-                
-                if len(updated_portfolio) == len(current_portfolio):
-                    send_message(chat_id, f"🔔 *{ticker_to_remove}* portföyünüzde bulunamadı.")
-                else:
-                    save_portfolio(chat_id, updated_portfolio)
-                    send_message(chat_id, f"✅ *{ticker_to_remove}* portföyünüzden çıkarıldı.")
-                continue
+def update_handler_name(update):
+    text = update.get("message", {}).get("text", "").strip()
+    if text.startswith("/"):
+        command = text.split()[0].lower()
+        return command if command in COMMANDS else "other"
+    return "symbols" if len(text.split()) > 1 else "symbol"
 
-            if text.lower() == "/portfoy":
-                user_portfolio = portfolios.get(str(chat_id), [])
-                if user_portfolio:
-                    port_text = "*📋 Portföyünüz:*\n"
-                    for item in user_portfolio:
-                        port_text += f"- {item['symbol']}: {item['quantity']} adet, Ortalama: {item['avg_price']:,.2f}\n"
-                else:
-                    port_text = "Portföyünüz boş. /add <hisse> <adet> komutuyla portföyünüze hisse ekleyebilirsiniz."
-                send_message(chat_id, port_text)
-                continue
+def handle_update(update):
+    with handler_latency.time(handler=update_handler_name(update)):
+        process_update(update)
 
-            if text.lower().startswith("/alert "):
-                try:
-                    parts = text.split()
-                    if len(parts) != 3:
-                        send_message(chat_id, "Lütfen doğru formatta girin: /alert HİSSE FİYAT")
-                        continue
-                    symbol, target_price = parts[1].upper(), parts[2]
-                    target_price = float(target_price.replace(",", "."))
-                    t, _ = fetch_ticker(symbol)
-                    price = t.fast_info.get("lastPrice", None)
-                    if price is None:
-                        send_message(chat_id, f"🔔 *{symbol}* bulunamadı.")
-                        continue
-                    save_alert(chat_id, symbol, target_price)
-                    send_message(chat_id, f"✅ *{symbol}* için {target_price:,.2f} fiyat alarmı oluşturuldu.")
-                except ValueError:
-                    send_message(chat_id, "Lütfen geçerli bir fiyat girin.")
-                except Exception as e:
-                    send_message(chat_id, f"🔔 *{symbol}* için alarm oluşturulurken hata: {e}")
-                continue
+def process_update(update):
+    try:
+        if "message" not in update:
+            return
 
-            if text.lower().startswith("/remove_alert "):
-                symbol = text[13:].strip().upper()
-                alerts = get_alerts(chat_id)
-                if any(alert["symbol"] == symbol for alert in alerts):
-                    remove_alert(chat_id, symbol)
-                    send_message(chat_id, f"✅ *{symbol}* alarmı silindi.")
-                else:
-                    send_message(chat_id, f"🔔 *{symbol}* için alarm bulunamadı.")
-                continue
+        chat_id = update["message"]["chat"]["id"]
+        text = update["message"].get("text", "").strip()
+        if not text:
+            return
+        remember_chat(chat_id, text)
+
+        if text.lower() == "/start":
+            save_user(chat_id)
+            send_message(chat_id, "*📈 Hoş Geldiniz!*\n\n"
+                "Bu bot ile hisse senedi, fon ve piyasa verilerini takip edebilirsiniz.\n"
+                "- Günlük piyasa özetleri için 09:00 ve 15:00 saatlerinde bildirim alırsınız.\n"
+                "- Bir hisse sembolü (örneğin: BIMAS) veya fon kodu (örneğin: TLY) yazarak anlık fiyatını, analizlerini ve grafiğini görüntüleyebilirsiniz.\n"
+                "- /add <hisse> <adet> ile portföyünüze hisse ekleyebilir,\n"
+                "- /remove <hisse> ile котороеportföyünüzden çıkarabilir,\n"
+                "- /portfoy ile portföyünüzü görebilir,\n"
+                "- /stop ile bildirimleri durdurabilirsiniz.\n"
+                "- /live ile portföy hisse ve kripto paralarınızın canlı fiyatlarını, düne göre değişimlerini ve kâr/zararınızı görebilirsiniz.\n"
+                "- /alert <hisse> <fiyat> ile hedef fiyat alarmı oluşturabilirsiniz.\n"
+                "- /remove\\_alert <hisse> ile hedef fiyat alarmını kaldırabilirsiniz.\n"
+                "- /alert\\_list ile aktif alarmlarınızı görebilirsiniz.\n\n"
+            )
+            print(f"✅ Yeni kullanıcı: {chat_id}")
+            return
 
-            if text.lower() == "/alert_list":
-                alerts = get_alerts(chat_id)
-                if alerts:
-                    msg = "*📋 Aktif Alarmlarınız:*\n\n"
-                    for alert in alerts:
-                        msg += f"- {alert['symbol']}: {alert['target_price']:,.2f}\n"
-                    send_message(chat_id, msg)
+        if text.lower() == "/stop":
+            deactivate_user(chat_id)
+            send_message(chat_id, "*📉 Bildirimler durduruldu.*\n"
+                "Tekrar bildirim almak için /start komutunu kullanabilirsiniz.")
+            print(f"❌ Kullanıcı bildirimleri durdurdu: {chat_id}")
+            return
+
+        if text.lower().startswith("/add "):
+            try:
+                parts = text.split()
+                if len(parts) != 3:
+                    send_message(chat_id, "Lütfen doğru formatta girin: /add HİSSE ADET")
+                    return
+                ticker_to_add = parts[1].strip().upper()
+                quantity = float(parts[2].strip())
+                if quantity <= 0:
+                    send_message(chat_id, "Adet pozitif bir sayı olmalıdır.")
+                    return
+
+                quote = get_quote(ticker_to_add)
+                if quote is None:
+                    send_message(chat_id, f"🔔 *{ticker_to_add}* bulunamadı.")
+                    return
+                _, current_price = quote
+
+                user_portfolio = repository.portfolio(chat_id)
+                existing_stock = next((item for item in user_portfolio if item["symbol"] == ticker_to_add), None)
+
+                if existing_stock:
+                    old_quantity = existing_stock["quantity"]
+                    old_avg_price = existing_stock["avg_price"]
+                    new_quantity = old_quantity + quantity
+                    new_avg_price = ((old_quantity * old_avg_price) + (quantity * current_price)) / new_quantity
+                    existing_stock["quantity"] = new_quantity
+                    existing_stock["avg_price"] = new_avg_price
+                    send_message(chat_id, f"✅ *{ticker_to_add}* portföyünüze eklendi.\n"
+                                         f"Yeni adet: {new_quantity}, Ortalama fiyat: {new_avg_price:,.2f}")
                 else:
-                    send_message(chat_id, "Aktif alarmınız bulunmuyor.")
-                continue
+                    user_portfolio.append({
+                        "symbol": ticker_to_add,
+                        "quantity": quantity,
+                        "avg_price": current_price
+                    })
+                    send_message(chat_id, f"✅ *{ticker_to_add}* portföyünüze eklendi.\n"
+                                         f"Adet: {quantity}, Alış fiyatı: {current_price:,.2f}")
+
+                save_portfolio(chat_id, user_portfolio)
+            except ValueError:
+                send_message(chat_id, "Lütfen geçerli bir adet girin.")
+            except Exception as e:
+                send_message(chat_id, f"🔔 *{ticker_to_add}* eklenirken hata: {e}")
+            return
 
-            symbol = text.upper()
-            if symbol in fon_kodlari:
-                fetch_fon_data(symbol, chat_id)
-                continue
+        if text.lower() == "/live":
+            user_portfolio = repository.portfolio(chat_id)
+            if user_portfolio:
+                send_live_visualization(chat_id, user_portfolio)
+            else:
+                send_message(chat_id, "Portföyünüz boş. /add <hisse> <adet> ile ekleyebilirsiniz.")
+            return
+
+
+        if text.lower().startswith("/remove "):
+            ticker_to_remove = text[8:].strip().upper()
+            
+            current_portfolio = repository.portfolio(chat_id)
+            
+            if not current_portfolio:
+                send_message(chat_id, f"🔔 *{ticker_to_remove}* portföyünüzde bulunamadı.")
+                return
+            
+            updated_portfolio = [item for item in current_portfolio if item["symbol"] != ticker_to_remove]
+            
+            if len(updated_portfolio) == len(current_portfolio):
+                send_message(chat_id, f"🔔 *{ticker_to_remove}* portföyünüzde bulunamadı.")
+            else:
+                save_portfolio(chat_id, updated_portfolio)
+                send_message(chat_id, f"✅ *{ticker_to_remove}* portföyünüzden çıkarıldı.")
+            return
 
-            t, symbol = fetch_ticker(symbol)
-            price = t.fast_info.get("lastPrice", "Veri yok")
-            hist = t.history(period="2d", interval="1d")["Close"].dropna()
-            if len(hist) >= 2:
-                change = ((price - hist.iloc[-2]) / hist.iloc[-2]) * 100
-                emoji = "🟢" if price > hist.iloc[-2] else "🔴" if price < hist.iloc[-2] else "⚪️"
-                reply = f"{symbol}: {price:,.2f} ({emoji} {change:+.2f}%)"
+        if text.lower() == "/portfoy":
+            user_portfolio = repository.portfolio(chat_id)
+            if user_portfolio:
+                port_text = "*📋 Portföyünüz:*\n"
+                for item in user_portfolio:
+                    port_text += f"- {item['symbol']}: {item['quantity']} adet, Ortalama: {item['avg_price']:,.2f}\n"
             else:
-                reply = f"{symbol}: {price:,.2f} (⚪️)"
-            send_message(chat_id, reply if price != "Veri yok" else f"{symbol}: Veri alınamadı")
+                port_text = "Portföyünüz boş. /add <hisse> <adet> komutuyla portföyünüze hisse ekleyebilirsiniz."
+            send_message(chat_id, port_text)
+            return
 
+        if text.lower().startswith("/alert "):
             try:
-                scraper = cloudscraper.CloudScraper()
-                url = "https://api.fintables.com/analyst-ratings/?brokerage_id=&code=&in_model_portfolio"
-                r = scraper.get(url).json()["results"]
-                df = pd.DataFrame(r)
-
-                df["title"] = df["brokerage"].apply(lambda x: x.get("title") if isinstance(x, dict) else None)
-                df = df[["code", "title", "type", "published_at", "price_target", "in_model_portfolio"]]
-                df["published_at"] = pd.to_datetime(df["published_at"]).dt.strftime("%Y-%m-%d")
-                df.columns = ["Hisse Kodu", "Kurum", "Öneri", "Öneri Tarihi", "Fiyat Hedefi", "Model Portföy"]
-                df["Model Portföy"] = df["Model Portföy"].replace({True: "Var", False: "Yok"})
-
-                öneri_df = df[df["Hisse Kodu"] == text.upper()].copy()
-
-                if not öneri_df.empty:
-                    t, symbol_full = fetch_ticker(text.upper())
-                    current_price = t.fast_info.get("lastPrice", None)
-                    
-                    if current_price:
-                        öneri_df.loc[:, "Son Fiyat"] = round(current_price, 2)
-                        öneri_df.loc[:, "Getiri Potansiyeli"] = (öneri_df["Fiyat Hedefi"].astype(float) - current_price).round(2)
-                        öneri_df.loc[:, "Getiri Potansiyeli (%)"] = (öneri_df["Getiri Potansiyeli"] / current_price * 100).round(2).astype(str) + "%"
-                        columns = ["Hisse Kodu", "Kurum", "Öneri", "Öneri Tarihi", "Fiyat Hedefi", "Son Fiyat", 
-                                "Getiri Potansiyeli", "Getiri Potansiyeli (%)", "Model Portföy"]
-                        öneri_df = öneri_df[columns]
-                    else:
-                        öneri_df.loc[:, "Son Fiyat"] = "Veri yok"
-                        öneri_df.loc[:, "Getiri Potansiyeli"] = "Veri yok"
-                        öneri_df.loc[:, "Getiri Potansiyeli (%)"] = "Veri yok"
-
-                    fig, ax = plt.subplots(figsize=(14, len(öneri_df) * 0.6 + 1))
-                    ax.axis('tight')
-                    ax.axis('off')
-                    table = ax.table(cellText=öneri_df.values, colLabels=öneri_df.columns, loc='center', cellLoc='center')
-                    table.auto_set_font_size(False)
-                    table.set_fontsize(10)
-                    table.scale(1.2, 1.1)
-
-                    öneri_image_path = f"oneriler_{text.upper()}.png"
-                    plt.tight_layout()
-                    plt.grid(False)
-                    plt.savefig(öneri_image_path, bbox_inches="tight", dpi=200)
-                    plt.close()
-
-                    send_photo(chat_id, öneri_image_path, f"🔎 *{text.upper()} için Analist Önerileri*")
-                    if os.path.exists(öneri_image_path):
-                        os.remove(öneri_image_path)
+                parts = text.split()
+                if len(parts) != 3:
+                    send_message(chat_id, "Lütfen doğru formatta girin: /alert HİSSE FİYAT")
+                    return
+                symbol, target_price = parts[1].upper(), parts[2]
+                percent = None
+                if "%" in target_price:
+                    percent = float(target_price.strip("%").replace(",", "."))
+                    if percent <= 0:
+                        raise ValueError
+                else:
+                    target_price = float(target_price.replace(",", "."))
+                quote = get_quote(symbol)
+                if quote is None:
+                    send_message(chat_id, f"🔔 *{symbol}* bulunamadı.")
+                    return
+                if percent:
+                    save_alert(chat_id, symbol, quote[1], percent)
+                    send_message(chat_id, f"✅ *{symbol}* için %{percent:g} hareket alarmı oluşturuldu (referans: {quote[1]:,.2f}).")
+                else:
+                    save_alert(chat_id, symbol, target_price, price=quote[1])
+                    send_message(chat_id, f"✅ *{symbol}* için {target_price:,.2f} fiyat alarmı oluşturuldu.")
+            except ValueError:
+                send_message(chat_id, "Lütfen geçerli bir fiyat girin.")
             except Exception as e:
-                print(f"Fintables veri hatası: {e}")
+                send_message(chat_id, f"🔔 *{symbol}* için alarm oluşturulurken hata: {e}")
+            return
 
-            df = t.history(period="1y")
-            if df.empty:
-                continue
-            for window, label in [(5,'MA5'), (20,'MA20'), (50,'MA50'), (200,'MA200')]:
-                df[label] = df['Close'].rolling(window).mean()
-            plt.figure(figsize=(10,6))
-            plt.plot(df['Close'], label='Close')
-            for ma in ['MA5', 'MA20', 'MA50', 'MA200']:
-                if not df[ma].isnull().all():
-                    plt.plot(df[ma], label=ma)
-            plt.title(f"{symbol} - 1 Yıllık Grafiği")
-            plt.legend()
-            plt.grid(False)
-            image_path = f"chart_{symbol.replace('.','')}.png"
-            plt.savefig(image_path)
-            plt.close()
-            send_photo(chat_id, image_path, f"{symbol} 1 Yıllık Grafiği")
-            if os.path.exists(image_path):
-                os.remove(image_path)
+        if text.lower().startswith("/remove_alert "):
+            symbol = text[13:].strip().upper()
+            alerts = get_alerts(chat_id)
+            if any(alert["symbol"] == symbol for alert in alerts):
+                remove_alert(chat_id, symbol)
+                send_message(chat_id, f"✅ *{symbol}* alarmı silindi.")
+            else:
+                send_message(chat_id, f"🔔 *{symbol}* için alarm bulunamadı.")
+            return
 
-        except Exception as e:
-            print(f"Hata (update_id: {update['update_id']}): {e}")
-            continue
+        if text.lower() == "/alert_list":
+            alerts = get_alerts(chat_id)
+            if alerts:
+                msg = "*📋 Aktif Alarmlarınız:*\n\n"
+                for alert in alerts:
+                    if alert.get("percent"):
+                        msg += f"- {alert['symbol']}: %{alert['percent']:g} (referans {alert['target_price']:,.2f})\n"
+                    else:
+                        msg += f"- {alert['symbol']}: {alert['target_price']:,.2f}\n"
+                send_message(chat_id, msg)
+            else:
+                send_message(chat_id, "Aktif alarmınız bulunmuyor.")
+            return
+
+        symbols = re.split(r"[\s,]+", text.upper().strip())
+        if len(symbols) > 1:
+            send_symbols_overview(chat_id, symbols)
+            return
 
-    return last_update_id
+        symbol = symbols[0]
+        if symbol in fund_catalog:
+            fetch_fon_data(symbol, chat_id)
+            return
+        send_symbol_info(chat_id, symbol)
+
+    except Exception as e:
+        print(f"Hata (update_id: {update['update_id']}): {e}")
 
 if __name__ == "__main__":
     print("🟢 Bot çalışıyor - Günlük piyasa özetleri ve hisse sorguları aktif")
+    chart_renderer.warm()
+    if METRICS_PORT:
+        serve(METRICS_PORT)
+    purge_stale_profiles()
+    try:
+        driver_pool.warm(DRIVER_POOL_SIZE if TEFAS_FETCH_MODE == "selenium" else 1)
+    except Exception as e:
+        print(f"Chrome havuzu ısıtılamadı: {e}")
+    repository.load()
+    try:
+        fund_catalog.load_snapshot()
+    except Exception as e:
+        print(f"Fon snapshot'ı okunamadı: {e}")
     print("İlk Excel dosyası indiriliyor...")
     download_excel()
 
     try:
-        init_updates = requests.get(f"https://api.telegram.org/bot{TOKEN}/getUpdates").json().get("result", [])
+        init_updates = get_updates()
         if init_updates:
             last_update_id = init_updates[-1]["update_id"] + 1
         else:
@@ -864,8 +1015,30 @@ if __name__ == "__main__":
     schedule.every(2).minutes.do(check_alerts)
     schedule.every().day.at("12:00").do(download_excel)
     schedule.every().hour.do(check_excel_and_redownload)
-
-    while True:
-        schedule.run_pending()
-        last_update_id = process_user_requests(last_update_id)
-        time.sleep(1)
+    schedule.every(ANALYST_RATINGS_TTL).seconds.do(analyst_ratings.refresh)
+    schedule.every(RECONCILE_MINUTES).minutes.do(repository.load)
+    if METRICS_DUMP_MINUTES:
+        schedule.every(METRICS_DUMP_MINUTES).minutes.do(registry.dump)
+    start_price_feed()
+    if price_feed is not None:
+        schedule.every().minute.do(sync_stream_symbols)
+
+    if BOT_RUNTIME == "async":
+        from async_runtime import AsyncBotRuntime
+
+        runtime = AsyncBotRuntime(
+            TOKEN,
+            handle_update,
+            max_handlers=UPDATE_WORKERS,
+            poll_timeout=POLL_TIMEOUT,
+            api_url=TELEGRAM_API_URL,
+            chat_lock_stripes=CHAT_LOCK_STRIPES,
+        )
+        http = runtime.http
+        runtime.run(last_update_id)
+    else:
+        start_update_workers(last_update_id)
+
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
@@ -0,0 +1,120 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import schedule
+
+
+class SyncHttpBridge:
+    def __init__(self, runtime):
+        self.runtime = runtime
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, **kwargs):
+        loop = self.runtime.loop
+        if loop is None or not loop.is_running():
+            raise RuntimeError("Async runtime çalışmıyor")
+        future = asyncio.run_coroutine_threadsafe(self.runtime.request(method, url, **kwargs), loop)
+        return future.result()
+
+
+class AsyncBotRuntime:
+    def __init__(self, token, handle_update, max_handlers=4, max_jobs=2, poll_timeout=30, max_connections=20,
+                 api_url="https://api.telegram.org", chat_lock_stripes=64):
+        self.token = token
+        self.api_url = api_url
+        self.handle_update = handle_update
+        self.poll_timeout = poll_timeout
+        self.max_handlers = max_handlers
+        self.max_connections = max_connections
+        self.handler_pool = ThreadPoolExecutor(max_workers=max_handlers, thread_name_prefix="handler")
+        self.job_pool = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix="job")
+        self.http = SyncHttpBridge(self)
+        self.client = None
+        self.loop = None
+        self.chat_lock_stripes = chat_lock_stripes
+        self.chat_locks = []
+        self.running_jobs = set()
+        self.tasks = set()
+
+    async def request(self, method, url, files=None, **kwargs):
+        if files:
+            files = {
+                name: f if isinstance(f, tuple) else (getattr(f, "name", name), f.read())
+                for name, f in files.items()
+            }
+        return await self.client.request(method, url, files=files, **kwargs)
+
+    def spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def dispatch(self, update):
+        chat_id = update.get("message", {}).get("chat", {}).get("id")
+        lock = self.chat_locks[hash(chat_id) % len(self.chat_locks)]
+        async with lock:
+            try:
+                await self.loop.run_in_executor(self.handler_pool, self.handle_update, update)
+            except Exception as e:
+                print(f"Hata (update_id: {update.get('update_id')}): {e}")
+
+    async def poll(self, last_update_id):
+        url = f"{self.api_url}/bot{self.token}/getUpdates"
+        while True:
+            params = {
+                "timeout": self.poll_timeout,
+                "allowed_updates": json.dumps(["message"]),
+            }
+            if last_update_id:
+                params["offset"] = last_update_id
+            try:
+                response = await self.client.get(url, params=params, timeout=self.poll_timeout + 10)
+                updates = response.json().get("result", [])
+            except Exception as e:
+                print(f"Güncellemeler alınırken hata: {e}")
+                await asyncio.sleep(3)
+                continue
+
+            for update in updates:
+                last_update_id = update["update_id"] + 1
+                self.spawn(self.dispatch(update))
+
+    async def run_job(self, job):
+        self.running_jobs.add(job)
+        try:
+            await self.loop.run_in_executor(self.job_pool, job.run)
+        except Exception as e:
+            print(f"Zamanlanmış görev hatası ({job}): {e}")
+        finally:
+            self.running_jobs.discard(job)
+
+    async def run_schedule(self):
+        while True:
+            for job in list(schedule.jobs):
+                if job.should_run and job not in self.running_jobs:
+                    self.spawn(self.run_job(job))
+            await asyncio.sleep(1)
+
+    async def main(self, last_update_id):
+        self.loop = asyncio.get_running_loop()
+        self.chat_locks = [asyncio.Lock() for _ in range(self.chat_lock_stripes)]
+        limits = httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections)
+        async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+            self.client = client
+            print(f"🟢 Async runtime başladı ({self.max_handlers} işleyici)")
+            await asyncio.gather(self.poll(last_update_id), self.run_schedule())
+
+    def run(self, last_update_id):
+        try:
+            asyncio.run(self.main(last_update_id))
+        finally:
+            self.handler_pool.shutdown(wait=False)
+            self.job_pool.shutdown(wait=False)
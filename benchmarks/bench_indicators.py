@@ -0,0 +1,57 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import compute_all, sma
+
+MA_WINDOWS = (5, 20, 50, 200)
+
+
+def random_closes(symbols, days, seed=0):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, days)), axis=1))
+
+
+def pandas_rolling(closes):
+    for row in closes:
+        df = pd.DataFrame({"Close": row})
+        for window in MA_WINDOWS:
+            df[f"MA{window}"] = df["Close"].rolling(window).mean()
+
+
+def numpy_batched(closes):
+    for window in MA_WINDOWS:
+        sma(closes, window)
+
+
+def best_of(fn, closes, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(closes)
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hareketli ortalama hesaplama karşılaştırması")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--days", type=int, default=252)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    closes = random_closes(args.symbols, args.days)
+    baseline = best_of(pandas_rolling, closes, args.repeat)
+    batched = best_of(numpy_batched, closes, args.repeat)
+    everything = best_of(compute_all, closes, args.repeat)
+
+    print(f"{args.symbols} sembol x {args.days} gün, en iyi {args.repeat} deneme")
+    print(f"pandas rolling (MA5/20/50/200, sembol başına): {baseline:9.2f} ms")
+    print(f"numpy toplu SMA (MA5/20/50/200):              {batched:9.2f} ms  ({baseline / batched:.0f}x)")
+    print(f"numpy toplu tüm göstergeler:                  {everything:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import io
+import itertools
+import json
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+PERIOD_BARS = {"1d": 1, "2d": 2, "5d": 5, "1mo": 22, "3mo": 66, "6mo": 126, "1y": 252, "2y": 504}
+
+
+def start_server(handler):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def server_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+class FakeBotApi:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.updates = []
+        self.sent = []
+        self.available_at = {}
+        self._next_id = 1
+        self._file_ids = 0
+        self._cond = threading.Condition()
+        self.server = start_server(self._handler())
+        self.url = server_url(self.server)
+
+    def push(self, chat_id, text):
+        with self._cond:
+            update_id = self._next_id
+            self._next_id += 1
+            self.updates.append({
+                "update_id": update_id,
+                "message": {"message_id": update_id, "chat": {"id": chat_id}, "text": text},
+            })
+            self.available_at[update_id] = time.perf_counter()
+            self._cond.notify_all()
+        return update_id
+
+    def get_updates(self, offset, timeout):
+        deadline = time.monotonic() + min(timeout, 1.0)
+        with self._cond:
+            while True:
+                pending = [update for update in self.updates if update["update_id"] >= offset]
+                remaining = deadline - time.monotonic()
+                if pending or remaining <= 0:
+                    return pending[:100]
+                self._cond.wait(remaining)
+
+    def record(self, method, chat_id):
+        with self._cond:
+            self.sent.append((time.perf_counter(), method, chat_id))
+            self._file_ids += 1
+            return f"file-{self._file_ids}"
+
+    def count(self, method=None, since=0.0):
+        with self._cond:
+            return sum(1 for at, m, _ in self.sent if at >= since and (method is None or m == method))
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, result):
+                body = json.dumps({"ok": True, "result": result}).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _form(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length)
+                content_type = self.headers.get("Content-Type", "")
+                if content_type.startswith("application/json"):
+                    return json.loads(body or b"{}")
+                if content_type.startswith("application/x-www-form-urlencoded"):
+                    return {key: values[0] for key, values in parse_qs(body.decode("utf-8")).items()}
+                chat_id = body.split(b'name="chat_id"\r\n\r\n', 1)[-1].split(b"\r\n", 1)[0]
+                return {"chat_id": chat_id.decode("utf-8", "replace")}
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if not url.path.endswith("/getUpdates"):
+                    self.send_error(404)
+                    return
+                params = {key: values[0] for key, values in parse_qs(url.query).items()}
+                updates = api.get_updates(int(params.get("offset", 0)), float(params.get("timeout", 0)))
+                self._reply(updates)
+
+            def do_POST(self):
+                method = urlparse(self.path).path.rsplit("/", 1)[-1]
+                form = self._form()
+                if api.latency:
+                    time.sleep(api.latency)
+                file_id = api.record(method, str(form.get("chat_id")))
+                if method == "sendPhoto":
+                    self._reply({"message_id": 1, "photo": [{"file_id": file_id}]})
+                else:
+                    self._reply({"message_id": 1})
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class FakeYahoo:
+    def __init__(self, tickers, latency=0.0):
+        self.latency = latency
+        self.tickers = set(tickers)
+        self.calls = 0
+        self._shift = {}
+        self._lock = threading.Lock()
+
+    def base_price(self, ticker):
+        return 10 + zlib.crc32(ticker.encode("utf-8")) % 490
+
+    def shift(self, factors):
+        with self._lock:
+            for ticker, factor in factors.items():
+                self._shift[ticker] = self._shift.get(ticker, 1.0) * factor
+
+    def last_price(self, ticker):
+        return self._series(ticker, 1)[-1]
+
+    def _series(self, ticker, bars):
+        rng = np.random.default_rng(zlib.crc32(ticker.encode("utf-8")))
+        walk = np.exp(np.cumsum(rng.normal(0, 0.015, 600)))
+        walk = walk / walk[-1] * self.base_price(ticker)
+        series = walk[-bars:].copy()
+        series[-1] *= self._shift.get(ticker, 1.0)
+        return series
+
+    def download(self, tickers, period=None, start=None, interval="1d", group_by="ticker", **kwargs):
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        if start:
+            index = pd.bdate_range(start=start, end=date.today())
+        else:
+            index = pd.bdate_range(end=date.today(), periods=PERIOD_BARS.get(period, 5))
+        if len(index) == 0:
+            index = pd.bdate_range(end=date.today() - timedelta(days=3), periods=1)
+
+        frames = {}
+        for ticker in tickers:
+            if ticker not in self.tickers:
+                continue
+            close = self._series(ticker, len(index))
+            frames[ticker] = pd.DataFrame({
+                "Open": close,
+                "High": close * 1.01,
+                "Low": close * 0.99,
+                "Close": close,
+                "Adj Close": close,
+                "Volume": np.full(len(index), 1_000_000),
+            }, index=index)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, axis=1)
+
+
+def fund_page(code, days=250):
+    dates = pd.bdate_range(end=date.today(), periods=days)
+    prices = np.round(1 + np.cumsum(np.full(days, 0.001)), 6)
+    info = "".join(f"<li>Alan<span>{value}</span></li>" for value in ("1,234567", "%0,12"))
+    investors = "<li>Alan<span>-</span></li><li>Yatırımcı<span>12.345</span></li>"
+    returns = "".join(f"<li>Getiri<span>%{i},00</span></li>" for i in range(1, 5))
+    details = "".join(f"<tr><td>Satır {i}</td><td>{i if i != 15 else 4}</td></tr>" for i in range(1, 16))
+    categories = ",".join(f'"{d:%d.%m.%Y}"' for d in dates)
+    data = ",".join(str(p) for p in prices)
+    return f"""<html><body>
+<div id="MainContent_PanelInfo">
+  <div><ul>{info}</ul><ul>{investors}</ul></div>
+  <div><ul>{returns}</ul></div>
+</div>
+<table id="MainContent_DetailsViewFund"><tbody>{details}</tbody></table>
+<script type="text/javascript">var chart = new Highcharts.Chart({{chart: {{renderTo: 'chartMainContent_FonFiyatGrafik'}},
+xAxis: {{categories: [{categories}]}}, series: [{{name: "{code}", color: [0], data: [{data}]}}]}});</script>
+</body></html>"""
+
+
+class FakeTefas:
+    def __init__(self, codes):
+        self.codes = list(codes)
+        self.pages = {code: fund_page(code).encode("utf-8") for code in self.codes}
+        self.server = start_server(self._handler())
+        self.fund_url = server_url(self.server) + "/FonAnaliz.aspx?FonKod={}"
+
+    def write_catalog(self, path):
+        rows = [["TEFAS Fon Listesi", None, None, None], ["Fon Kodu", "Fon Adı", "1 Ay (%)", "1 Yıl (%)"]]
+        rows += [[code, f"{code} Test Fonu", 1.5 + i, None if i % 2 else 40.0 + i] for i, code in enumerate(self.codes)]
+        buffer = io.BytesIO()
+        pd.DataFrame(rows).to_excel(buffer, header=False, index=False, engine="openpyxl")
+        with open(path, "wb") as f:
+            f.write(buffer.getvalue())
+
+    def _handler(self):
+        tefas = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                code = parse_qs(urlparse(self.path).query).get("FonKod", [""])[0]
+                page = tefas.pages.get(code, b"<html></html>")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+class MemoryQuery:
+    def __init__(self, table, lock, ids):
+        self.table = table
+        self.lock = lock
+        self.ids = ids
+        self.action = "select"
+        self.columns = ("*",)
+        self.payload = None
+        self.conflict = None
+        self.filters = []
+
+    def select(self, *columns):
+        self.action, self.columns = "select", columns or ("*",)
+        return self
+
+    def insert(self, rows):
+        self.action, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self.action, self.payload = "upsert", rows if isinstance(rows, list) else [rows]
+        self.conflict = [column.strip() for column in on_conflict.split(",") if column.strip()]
+        return self
+
+    def update(self, values):
+        self.action, self.payload = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def _matches(self, row):
+        return all(check(row) for check in self.filters)
+
+    def execute(self):
+        with self.lock:
+            if self.action == "select":
+                rows = [row for row in self.table if self._matches(row)]
+                if self.columns != ("*",):
+                    rows = [{column: row.get(column) for column in self.columns} for row in rows]
+                return SimpleNamespace(data=[dict(row) for row in rows])
+            if self.action == "insert":
+                rows = [{"id": next(self.ids), **row} for row in self.payload]
+                self.table.extend(rows)
+                return SimpleNamespace(data=[dict(row) for row in rows])
+            if self.action == "upsert":
+                for row in self.payload:
+                    key = tuple(row.get(column) for column in self.conflict)
+                    for existing in self.table:
+                        if tuple(existing.get(column) for column in self.conflict) == key:
+                            existing.update(row)
+                            break
+                    else:
+                        self.table.append(dict(row))
+                return SimpleNamespace(data=self.payload)
+            if self.action == "update":
+                rows = [row for row in self.table if self._matches(row)]
+                for row in rows:
+                    row.update(self.payload)
+                return SimpleNamespace(data=rows)
+            removed = [row for row in self.table if self._matches(row)]
+            self.table[:] = [row for row in self.table if not self._matches(row)]
+            return SimpleNamespace(data=removed)
+
+
+class MemorySupabase:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.tables = {}
+        self.ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def table(self, name):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            rows = self.tables.setdefault(name, [])
+        return MemoryQuery(rows, self._lock, self.ids)
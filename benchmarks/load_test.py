@@ -0,0 +1,221 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import FakeBotApi, FakeTefas, FakeYahoo, MemorySupabase  # noqa: E402
+
+ASSETS = ["XU100.IS", "XU030.IS", "USDTRY=X", "EURTRY=X", "GC=F", "SI=F", "BTC-USD", "ETH-USD"]
+FUND_CODES = ["AAK", "TLY", "MAC", "IPB", "YAY"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Botu sahte Telegram/Yahoo/TEFAS/Supabase servislerine karşı çalıştırır")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--holdings", type=int, default=5, help="kullanıcı başına portföy kalemi")
+    parser.add_argument("--alerts", type=int, default=1000, help="toplam alarm sayısı")
+    parser.add_argument("--symbols", type=int, default=100, help="sembol evreninin büyüklüğü")
+    parser.add_argument("--messages", type=int, default=500, help="gönderilecek kullanıcı mesajı sayısı")
+    parser.add_argument("--rate", type=float, default=0, help="mesaj/sn (0: hepsi aynı anda)")
+    parser.add_argument("--workers", type=int, default=4, help="UPDATE_WORKERS")
+    parser.add_argument("--chart-workers", type=int, default=2, help="CHART_WORKERS")
+    parser.add_argument("--api-latency", type=float, default=20, help="sahte Bot API gecikmesi (ms)")
+    parser.add_argument("--yahoo-latency", type=float, default=150, help="sahte yf.download gecikmesi (ms)")
+    parser.add_argument("--db-latency", type=float, default=10, help="sahte Supabase gecikmesi (ms)")
+    parser.add_argument("--broadcast-rate", type=float, default=1000, help="BROADCAST_RATE")
+    parser.add_argument("--timeout", type=float, default=300, help="mesaj senaryosu için en uzun bekleme (sn)")
+    parser.add_argument("--metrics", action="store_true", help="sonunda metrik özetini de yazdır")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def configure_env(args, workdir, api):
+    os.environ.update({
+        "TOKEN": "benchmark",
+        "TELEGRAM_API_URL": api.url,
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": ":memory:",
+        "HISTORY_DIR": os.path.join(workdir, "history"),
+        "SYMBOL_INDEX_PATH": os.path.join(workdir, "symbols.json"),
+        "UPDATE_WORKERS": str(args.workers),
+        "CHART_WORKERS": str(args.chart_workers),
+        "BROADCAST_RATE": str(args.broadcast_rate),
+        "POLL_TIMEOUT": "1",
+        "PRICE_FEED": "poll",
+    })
+
+
+def seed_data(args, app, supabase, symbols, yahoo, rng):
+    users = list(range(1, args.users + 1))
+    supabase.tables["users"] = [{"chat_id": chat_id, "is_active": True} for chat_id in users]
+    supabase.tables["portfolios"] = [
+        {
+            "chat_id": chat_id,
+            "symbol": symbol,
+            "quantity": float(rng.randint(1, 500)),
+            "avg_price": round(yahoo.base_price(symbol + ".IS") * rng.uniform(0.7, 1.3), 2),
+        }
+        for chat_id in users
+        for symbol in rng.sample(symbols, min(args.holdings, len(symbols)))
+    ]
+    alerts = []
+    for _ in range(args.alerts):
+        symbol = rng.choice(symbols)
+        price = yahoo.last_price(symbol + ".IS")
+        alerts.append({
+            "id": next(supabase.ids),
+            "chat_id": rng.choice(users),
+            "symbol": symbol,
+            "target_price": round(price * rng.uniform(0.9, 1.1), 2),
+            "percent": None,
+        })
+    supabase.tables["alerts"] = alerts
+    supabase.tables["user_logs"] = []
+    app.repository.load()
+    return users
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) * 1000 if values else 0.0
+
+
+def run_messages(args, app, api, users, symbols, rng):
+    done = {}
+    lock = threading.Lock()
+    handle_update = app.handle_update
+
+    def timed_handle_update(update):
+        try:
+            handle_update(update)
+        finally:
+            with lock:
+                done[update["update_id"]] = time.perf_counter()
+
+    app.handle_update = timed_handle_update
+    app.start_update_workers(0)
+
+    funds = FUND_CODES[:]
+    kinds = ["symbol"] * 5 + ["symbols", "/portfoy", "/alert_list", "/live", "fund"]
+    started = time.perf_counter()
+    update_ids = []
+    for i in range(args.messages):
+        kind = rng.choice(kinds)
+        if kind == "symbol":
+            text = rng.choice(symbols)
+        elif kind == "symbols":
+            text = " ".join(rng.sample(symbols, 3))
+        elif kind == "fund":
+            text = rng.choice(funds)
+        else:
+            text = kind
+        update_ids.append(api.push(rng.choice(users), text))
+        if args.rate:
+            time.sleep(max(0.0, started + (i + 1) / args.rate - time.perf_counter()))
+
+    deadline = time.monotonic() + args.timeout
+    while time.monotonic() < deadline:
+        with lock:
+            if len(done) >= len(update_ids):
+                break
+        time.sleep(0.05)
+
+    with lock:
+        latencies = [done[u] - api.available_at[u] for u in update_ids if u in done]
+        finished = max(done.values()) if done else started
+    elapsed = finished - started
+    return {
+        "handled": len(latencies),
+        "total": len(update_ids),
+        "elapsed": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 50),
+        "p99": percentile(latencies, 99),
+        "replies": api.count(since=started),
+    }
+
+
+def run_alert_sweeps(app, api, yahoo, symbols, rng):
+    from market_data import quote_cache
+
+    results = []
+    for label in ("ilk tarama", "fiyat hareketi sonrası"):
+        if results:
+            yahoo.shift({symbol + ".IS": rng.choice((0.93, 1.07)) for symbol in symbols})
+        quote_cache.clear()
+        since = time.perf_counter()
+        app.check_alerts()
+        results.append((label, time.perf_counter() - since, api.count("sendMessage", since=since)))
+    return results
+
+
+def run_broadcast(app, api):
+    since = time.perf_counter()
+    app.send_market_summary_to_all()
+    return time.perf_counter() - since, api.count("sendMessage", since=since)
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="bot-bench-")
+    os.chdir(workdir)
+
+    api = FakeBotApi(latency=args.api_latency / 1000)
+    symbols = [f"SYM{i:03d}" for i in range(args.symbols)]
+    yahoo = FakeYahoo([symbol + ".IS" for symbol in symbols] + ASSETS, latency=args.yahoo_latency / 1000)
+    tefas = FakeTefas(FUND_CODES)
+    supabase = MemorySupabase(latency=args.db_latency / 1000)
+    configure_env(args, workdir, api)
+
+    import market_data
+    import tefas as tefas_module
+
+    market_data.yf = yahoo
+    tefas_module.FUND_URL = tefas.fund_url
+
+    import app
+    from storage import SupabaseStorage
+
+    app.repository.storage = SupabaseStorage(supabase)
+    app.analyst_ratings.loaded_at = time.monotonic()
+    app.analyst_ratings.ttl = float("inf")
+    tefas.write_catalog(app.excel_file_path)
+    app.fund_catalog.load(force=True)
+    app.chart_renderer.warm()
+
+    users = seed_data(args, app, supabase, symbols, yahoo, rng)
+    print(
+        f"⚙️ {len(users)} kullanıcı, {args.holdings} kalem/portföy, {args.alerts} alarm, "
+        f"{len(symbols)} sembol, {args.workers} işçi - çalışma klasörü {workdir}"
+    )
+
+    messages = run_messages(args, app, api, users, symbols, rng)
+    sweeps = run_alert_sweeps(app, api, yahoo, symbols, rng)
+    broadcast_duration, broadcast_sent = run_broadcast(app, api)
+
+    print("\n📈 Sonuçlar")
+    print(
+        f"Mesajlar: {messages['handled']}/{messages['total']} işlendi, {messages['elapsed']:.2f} sn, "
+        f"{messages['throughput']:.1f} mesaj/sn, {messages['replies']} yanıt"
+    )
+    print(f"Yanıt gecikmesi: p50 {messages['p50']:.0f} ms, p99 {messages['p99']:.0f} ms")
+    for label, duration, triggered in sweeps:
+        print(f"Alarm taraması ({label}): {duration * 1000:.0f} ms, {triggered} bildirim")
+    print(f"Piyasa özeti: {broadcast_duration:.2f} sn, {broadcast_sent} mesaj")
+    print(f"Sahte yf.download çağrısı: {yahoo.calls}")
+
+    if args.metrics:
+        app.registry.dump()
+    app.chart_renderer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class ChatLimiter:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, chat_id):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(chat_id, 0))
+            self._next[chat_id] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+class BroadcastReport:
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.deactivated = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, field, count=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + count)
+
+    def __str__(self):
+        return (
+            f"gönderilen: {self.sent}, başarısız: {self.failed}, pasif yapılan: {self.deactivated}, "
+            f"tekrar: {self.retries}, 429: {self.rate_limited}, süre: {self.duration:.1f} sn"
+        )
+
+
+class Broadcaster:
+    def __init__(self, post, deactivate, rate=25, per_chat_interval=1.0, workers=8, max_retries=3):
+        self.post = post
+        self.deactivate = deactivate
+        self.bucket = TokenBucket(rate)
+        self.chat_limiter = ChatLimiter(per_chat_interval)
+        self.workers = workers
+        self.max_retries = max_retries
+
+    def _error(self, response):
+        try:
+            return response.json()
+        except Exception:
+            return {}
+
+    def _deliver(self, chat_id, text, report):
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                report.add("retries")
+            self.chat_limiter.acquire(chat_id)
+            self.bucket.acquire()
+
+            response = self.post(chat_id, text)
+            if response is None:
+                time.sleep(2 ** attempt)
+                continue
+            if response.status_code < 400:
+                report.add("sent")
+                return
+
+            error = self._error(response)
+            if response.status_code == 429:
+                report.add("rate_limited")
+                retry_after = error.get("parameters", {}).get("retry_after", 1)
+                self.bucket.pause(retry_after)
+                time.sleep(retry_after)
+                continue
+            if response.status_code >= 500:
+                time.sleep(2 ** attempt)
+                continue
+
+            description = error.get("description", "").lower()
+            if 'bot was blocked' in description or 'chat not found' in description or 'user is deactivated' in description:
+                self.deactivate(chat_id)
+                report.add("deactivated")
+                print(f"Kullanıcı {chat_id} engelledi veya sohbet yok. Pasif yapıldı.")
+            else:
+                report.add("failed")
+                print(f"{chat_id} için mesaj gönderilemedi: {description or response.status_code}")
+            return
+
+        report.add("failed")
+        print(f"{chat_id} için mesaj {self.max_retries + 1} denemede gönderilemedi.")
+
+    def run(self, messages):
+        report = BroadcastReport()
+        started = time.monotonic()
+
+        def deliver(message):
+            chat_id, text = message
+            try:
+                self._deliver(chat_id, text, report)
+            except Exception as e:
+                report.add("failed")
+                print(f"{chat_id} için gönderim hatası: {e}")
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="broadcast") as pool:
+            list(pool.map(deliver, messages))
+
+        report.duration = time.monotonic() - started
+        return report
@@ -0,0 +1,225 @@
+import io
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import matplotlib
+
+matplotlib.use("Agg")
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Circle
+import numpy as np
+import seaborn as sns
+
+from indicators import rsi, sma
+from metrics import registry
+
+chart_render = registry.histogram("chart_render_seconds", "Grafik çizim süresi (kuyruk beklemesi dahil)")
+
+
+def to_png(fig, dpi=200, **kwargs):
+    FigureCanvasAgg(fig)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, **kwargs)
+    return buffer.getvalue()
+
+
+def render_fund_chart(code, df):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    ax.plot(df["Tarih"], df["Fiyat"], label="Fiyat")
+    ax.set_title(f"{code} - Fiyat Grafiği")
+    ax.set_xlabel("Tarih")
+    ax.set_ylabel("Fiyat")
+    ax.legend()
+    return to_png(fig, bbox_inches="tight")
+
+
+def render_ma_chart(symbol, df, windows=(5, 20, 50, 200)):
+    closes = df["Close"].to_numpy(dtype=float)
+    fig = Figure(figsize=(10, 8))
+    ax, rsi_ax = fig.subplots(2, 1, sharex=True, gridspec_kw={"height_ratios": [3, 1]})
+    ax.plot(df.index, closes, label="Close")
+    for window in windows:
+        ma = sma(closes, window)
+        if not np.isnan(ma).all():
+            ax.plot(df.index, ma, label=f"MA{window}")
+    ax.set_title(f"{symbol} - 1 Yıllık Grafiği")
+    ax.legend()
+    ax.grid(False)
+
+    rsi_ax.plot(df.index, rsi(closes), color="tab:purple", label="RSI(14)")
+    rsi_ax.axhline(70, color="tab:red", linewidth=0.8, linestyle="--")
+    rsi_ax.axhline(30, color="tab:green", linewidth=0.8, linestyle="--")
+    rsi_ax.set_ylim(0, 100)
+    rsi_ax.legend(loc="upper left")
+    return to_png(fig, dpi=100)
+
+
+def render_comparison_chart(series):
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    for name, closes in series.items():
+        ax.plot(closes.index, closes / closes.iloc[0] * 100, label=name)
+    ax.axhline(100, color="grey", linewidth=0.8, linestyle="--")
+    ax.set_title("1 Yıllık Karşılaştırma (başlangıç = 100)")
+    ax.legend()
+    return to_png(fig, dpi=100)
+
+
+def render_table(df):
+    fig = Figure(figsize=(14, len(df) * 0.6 + 1))
+    ax = fig.subplots()
+    ax.axis("tight")
+    ax.axis("off")
+    table = ax.table(cellText=df.values, colLabels=df.columns, loc="center", cellLoc="center")
+    table.auto_set_font_size(False)
+    table.set_fontsize(10)
+    table.scale(1.2, 1.1)
+    fig.tight_layout()
+    return to_png(fig, bbox_inches="tight")
+
+
+def render_portfolio_chart(valuation):
+    with sns.axes_style("whitegrid"):
+        colors = sns.color_palette("tab20", n_colors=len(valuation))
+        fig = Figure(figsize=(8, max(6, len(valuation) * 0.4)))
+        ax = fig.subplots()
+
+        wedges, texts, autotexts = ax.pie(
+            valuation.value,
+            labels=None,
+            startangle=90,
+            colors=colors,
+            wedgeprops={"edgecolor": "white", "linewidth": 1},
+            pctdistance=0.75,
+            autopct=lambda pct: f"{pct:.1f}%" if pct > 1 else ""
+        )
+
+        labels = [
+            f"{sym} ({int(q)} adet)\nK/Z: {pnl:,.2f} ({roi:+.2f}%)"
+            for sym, q, pnl, roi in zip(valuation.symbols, valuation.quantity, valuation.pnl, valuation.roi)
+        ]
+        ax.legend(
+            wedges,
+            labels,
+            title="Portföyünüz",
+            bbox_to_anchor=(1, 0.5),
+            loc="center left",
+            fontsize=10
+        )
+
+        ax.add_artist(Circle((0, 0), 0.60, fc="white"))
+        ax.axis("equal")
+        ax.set_title("Portföy Dağılımı", pad=20)
+        fig.subplots_adjust(left=0.0, right=0.75, bottom=0.25)
+
+        table = ax.table(
+            cellText=[[
+                f"{valuation.total_cost:,.2f}",
+                f"{valuation.total_value:,.2f}",
+                f"{valuation.total_pnl:,.2f} ({valuation.total_roi:+.2f}%)"
+            ]],
+            colLabels=["Maliyet", "Değer", "Kâr/Zarar"],
+            cellLoc="center",
+            loc="bottom",
+            bbox=[0.0, -0.22, 0.75, 0.15]
+        )
+        table.auto_set_font_size(False)
+        table.set_fontsize(10)
+
+        fig.tight_layout()
+        return to_png(fig, dpi=150, bbox_inches="tight")
+
+
+def _ready():
+    return True
+
+
+class ChartRenderer:
+    def __init__(self, workers=2, max_pending=None, timeout=60):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending or max(1, workers) * 2)
+        self._lock = threading.Lock()
+        self._pool = None
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(method),
+                )
+            return self._pool
+
+    def warm(self):
+        if self.workers:
+            self._executor().submit(_ready).result(timeout=self.timeout)
+
+    def render(self, fn, *args):
+        with chart_render.time(chart=fn.__name__), self._slots:
+            if not self.workers:
+                return fn(*args)
+            pool = self._executor()
+            try:
+                return pool.submit(fn, *args).result(timeout=self.timeout)
+            except BrokenProcessPool:
+                with self._lock:
+                    if self._pool is pool:
+                        self._pool = None
+                pool.shutdown(wait=False)
+                raise
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ChartCache:
+    def __init__(self, ttl=3600, max_size=512):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def key_lock(self, key):
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get(self, key, data_date):
+        if data_date is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != data_date or entry[1] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key, data_date, file_id):
+        if data_date is None or not file_id:
+            return
+        with self._lock:
+            self._entries[key] = (data_date, time.monotonic() + self.ttl, file_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                self._key_locks.pop(evicted, None)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
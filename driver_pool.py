@@ -0,0 +1,105 @@
+import glob
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+
+PROFILE_PREFIX = "tefas-chrome-"
+
+
+def remove_profile(profile_dir):
+    if profile_dir:
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+def purge_stale_profiles():
+    for profile_dir in glob.glob(os.path.join(tempfile.gettempdir(), PROFILE_PREFIX + "*")):
+        remove_profile(profile_dir)
+
+
+class DriverPool:
+    def __init__(self, factory, size=2, max_uses=50, checkout_timeout=120):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self._idle = []
+        self._uses = {}
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _healthy(self, driver):
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _destroy(self, driver):
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            print(f"Chrome kapatılırken hata: {e}")
+        remove_profile(getattr(driver, "profile_dir", None))
+
+    def checkout(self, timeout=None):
+        if not self._slots.acquire(timeout=timeout or self.checkout_timeout):
+            raise TimeoutError("Boşta Chrome bulunamadı (havuz dolu)")
+        try:
+            while True:
+                with self._lock:
+                    driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    driver = self.factory()
+                    with self._lock:
+                        self._uses[id(driver)] = 0
+                    return driver
+                if self._healthy(driver):
+                    return driver
+                print("♻️ Sağlıksız Chrome kapatılıyor")
+                self._destroy(driver)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def checkin(self, driver, broken=False):
+        try:
+            with self._lock:
+                uses = self._uses.get(id(driver), 0) + 1
+                self._uses[id(driver)] = uses
+            if broken or uses >= self.max_uses:
+                self._destroy(driver)
+            else:
+                with self._lock:
+                    self._idle.append(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def driver(self, timeout=None):
+        driver = self.checkout(timeout)
+        try:
+            yield driver
+        except Exception:
+            self.checkin(driver, broken=not self._healthy(driver))
+            raise
+        else:
+            self.checkin(driver)
+
+    def warm(self, count=1):
+        drivers = []
+        try:
+            for _ in range(min(count, self.size)):
+                drivers.append(self.checkout())
+        finally:
+            for driver in drivers:
+                self.checkin(driver)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._destroy(driver)
@@ -0,0 +1,148 @@
+import glob
+import os
+import threading
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+SNAPSHOT_KEEP_DAYS = int(os.getenv("SNAPSHOT_KEEP_DAYS", "365"))
+
+
+class FundCatalog:
+    def __init__(self, path, snapshot_dir=None):
+        self.path = path
+        self.snapshot_dir = snapshot_dir or os.path.join(os.path.dirname(path), "snapshots")
+        self.table = None
+        self.codes = frozenset()
+        self.columns = []
+        self.row_count = 0
+        self._rows = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def _parse(self, df):
+        first = df.iloc[:, 0]
+        values = first.dropna().unique()
+        if len(values) == 0:
+            return pd.DataFrame({"code": pd.Series(dtype=str)})
+
+        header_pos = first[first == values[0]].index[0]
+        columns = ["code"]
+        for c in df.loc[header_pos].iloc[1:]:
+            name = str(c).strip()
+            while name in columns:
+                name += "_"
+            columns.append(name)
+        codes = {str(code).strip() for code in values[1:]}
+
+        frame = df.loc[header_pos + 1:].copy()
+        frame.columns = columns
+        frame["code"] = frame["code"].astype(str).str.strip()
+        frame = frame[frame["code"].isin(codes)].drop_duplicates("code").reset_index(drop=True)
+
+        for column in columns[1:]:
+            numeric = pd.to_numeric(frame[column], errors="coerce")
+            if numeric.notna().sum() == frame[column].notna().sum():
+                frame[column] = numeric
+            else:
+                frame[column] = frame[column].astype("string")
+        return frame
+
+    def _set_table(self, table, source_mtime, row_count):
+        codes = table.column("code").to_pylist()
+        self.table = table
+        self.codes = frozenset(codes)
+        self.columns = [name for name in table.column_names if name != "code"]
+        self._rows = {code: i for i, code in enumerate(codes)}
+        self.row_count = row_count
+        self._mtime = source_mtime
+
+    def snapshot_path(self, day):
+        return os.path.join(self.snapshot_dir, f"tefas_funds_{day:%Y-%m-%d}.feather")
+
+    def snapshot_paths(self):
+        return sorted(glob.glob(os.path.join(self.snapshot_dir, "tefas_funds_*.feather")))
+
+    def write_snapshot(self, table, source_mtime, row_count):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        table = table.replace_schema_metadata({
+            "source_mtime": str(source_mtime),
+            "row_count": str(row_count),
+        })
+        path = self.snapshot_path(date.today())
+        tmp_path = path + ".tmp"
+        feather.write_feather(table, tmp_path, compression="uncompressed")
+        os.replace(tmp_path, path)
+
+        for old_path in self.snapshot_paths()[:-SNAPSHOT_KEEP_DAYS]:
+            os.remove(old_path)
+
+    def load_snapshot(self):
+        with self._lock:
+            paths = self.snapshot_paths()
+            if not paths:
+                return False
+            table = feather.read_table(paths[-1], memory_map=True)
+            metadata = table.schema.metadata or {}
+            self._set_table(
+                table,
+                float(metadata.get(b"source_mtime", b"0")),
+                int(metadata.get(b"row_count", str(table.num_rows).encode())),
+            )
+            print(f"📚 Fon kataloğu snapshot'tan yüklendi: {len(self.codes)} fon ({os.path.basename(paths[-1])})")
+            return True
+
+    def load(self, force=False):
+        with self._lock:
+            if not os.path.exists(self.path):
+                if self.table is None:
+                    self.codes, self.columns, self.row_count, self._rows = frozenset(), [], 0, {}
+                return False
+
+            mtime = os.path.getmtime(self.path)
+            if not force and mtime == self._mtime:
+                return False
+
+            df = pd.read_excel(self.path)
+            table = pa.Table.from_pandas(self._parse(df), preserve_index=False)
+            self._set_table(table, mtime, len(df))
+            print(f"📚 Fon kataloğu yüklendi: {len(self.codes)} fon")
+
+            if self.codes:
+                try:
+                    self.write_snapshot(table, mtime, len(df))
+                except Exception as e:
+                    print(f"Fon snapshot'ı yazılamadı: {e}")
+            return True
+
+    def refresh(self):
+        try:
+            return self.load()
+        except Exception as e:
+            print(f"Fon kataloğu okunamadı: {e}")
+            return False
+
+    def get(self, code):
+        self.refresh()
+        row = self._rows.get(code)
+        if row is None:
+            return None
+        return {name: self.table.column(name)[row].as_py() for name in self.columns}
+
+    def history(self, code, days=None):
+        rows = []
+        paths = self.snapshot_paths()
+        for path in paths[-days:] if days else paths:
+            table = feather.read_table(path, memory_map=True)
+            match = table.filter(pc.equal(table.column("code"), code))
+            if match.num_rows:
+                day = os.path.basename(path)[len("tefas_funds_"):-len(".feather")]
+                rows.append({"date": day, **{k: v[0] for k, v in match.to_pydict().items() if k != "code"}})
+        return rows
+
+    def __contains__(self, code):
+        self.refresh()
+        return code in self.codes
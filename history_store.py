@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import date, timedelta
+from urllib.parse import quote
+
+import pandas as pd
+
+from market_data import download_bars
+
+HISTORY_DIR = os.getenv("HISTORY_DIR", os.path.join("downloads", "history"))
+HISTORY_REFRESH = float(os.getenv("HISTORY_REFRESH", "300"))
+HISTORY_KEEP_DAYS = int(os.getenv("HISTORY_KEEP_DAYS", "730"))
+
+
+class HistoryStore:
+    def __init__(self, directory, refresh_interval=300, keep_days=730, initial_period="1y"):
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self.keep_days = keep_days
+        self.initial_period = initial_period
+        self._frames = {}
+        self._checked_at = {}
+        self._lock = threading.Lock()
+        self._inflight = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, ticker):
+        return os.path.join(self.directory, quote(ticker, safe="") + ".parquet")
+
+    def _read(self, ticker):
+        with self._lock:
+            if ticker in self._frames:
+                return self._frames[ticker]
+        try:
+            frame = pd.read_parquet(self._path(ticker))
+        except FileNotFoundError:
+            frame = None
+        except Exception as e:
+            print(f"{ticker} geçmiş verisi okunamadı: {e}")
+            frame = None
+        with self._lock:
+            return self._frames.setdefault(ticker, frame)
+
+    def _write(self, ticker, frame):
+        path = self._path(ticker)
+        tmp_path = path + ".tmp"
+        frame.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _merge(self, old, new):
+        frame = new if old is None else pd.concat([old, new])
+        frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        cutoff = pd.Timestamp(date.today() - timedelta(days=self.keep_days))
+        return frame[frame.index >= cutoff]
+
+    def _is_stale(self, ticker, now):
+        checked_at = self._checked_at.get(ticker)
+        return checked_at is None or now - checked_at > self.refresh_interval
+
+    def _download(self, tickers, now):
+        groups = {}
+        for ticker in tickers:
+            frame = self._read(ticker)
+            start = None if frame is None or frame.empty else frame.index[-1].strftime("%Y-%m-%d")
+            groups.setdefault(start, []).append(ticker)
+
+        for start, group in groups.items():
+            try:
+                bars = download_bars(group, period=self.initial_period, start=start)
+            except Exception as e:
+                print(f"Geçmiş veriler güncellenemedi ({len(group)} sembol): {e}")
+                continue
+
+            for ticker in group:
+                with self._lock:
+                    self._checked_at[ticker] = now
+                if ticker not in bars:
+                    continue
+                frame = self._merge(self._read(ticker), bars[ticker])
+                with self._lock:
+                    self._frames[ticker] = frame
+                try:
+                    self._write(ticker, frame)
+                except Exception as e:
+                    print(f"{ticker} geçmiş verisi kaydedilemedi: {e}")
+
+    def refresh(self, tickers):
+        now = time.monotonic()
+        owned, waiting = {}, []
+        with self._lock:
+            for ticker in dict.fromkeys(tickers):
+                if ticker in self._inflight:
+                    waiting.append(self._inflight[ticker])
+                elif self._is_stale(ticker, now):
+                    owned[ticker] = self._inflight[ticker] = Future()
+
+        if owned:
+            try:
+                self._download(list(owned), now)
+            finally:
+                with self._lock:
+                    for ticker, future in owned.items():
+                        self._inflight.pop(ticker, None)
+                        future.set_result(None)
+
+        for future in waiting:
+            future.result()
+
+    def histories(self, tickers, days=365):
+        self.refresh(tickers)
+        cutoff = pd.Timestamp(date.today() - timedelta(days=days))
+        result = {}
+        for ticker in dict.fromkeys(tickers):
+            frame = self._read(ticker)
+            if frame is not None and not frame.empty:
+                result[ticker] = frame[frame.index >= cutoff]
+        return result
+
+    def history(self, ticker, days=365):
+        return self.histories([ticker], days).get(ticker, pd.DataFrame())
+
+    def closes(self, tickers, bars=5):
+        self.refresh(tickers)
+        result = {}
+        for ticker in dict.fromkeys(tickers):
+            frame = self._read(ticker)
+            if frame is not None and not frame.empty:
+                result[ticker] = frame["Close"].iloc[-bars:]
+        return result
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+
+def as_matrix(closes):
+    closes = np.asarray(closes, dtype=float)
+    return closes[np.newaxis, :] if closes.ndim == 1 else closes
+
+
+def stack_closes(series):
+    rows = [pd.Series(closes).dropna().to_numpy(dtype=float) for closes in series.values()]
+    matrix = np.full((len(rows), max((len(row) for row in rows), default=0)), np.nan)
+    for out, row in zip(matrix, rows):
+        out[len(out) - len(row):] = row
+    return list(series), matrix
+
+
+def _shape_like(result, closes):
+    return result[0] if np.ndim(closes) == 1 else result
+
+
+def _rolling_sums(values, window):
+    valid = ~np.isnan(values)
+    pad = np.zeros((values.shape[0], 1))
+    totals = np.concatenate([pad, np.cumsum(np.where(valid, values, 0.0), axis=1)], axis=1)
+    counts = np.concatenate([pad, np.cumsum(valid, axis=1)], axis=1)
+    sums = totals[:, window:] - totals[:, :-window]
+    full = (counts[:, window:] - counts[:, :-window]) == window
+    return sums, full
+
+
+def _rolling_mean(values, window):
+    out = np.full(values.shape, np.nan)
+    if window > values.shape[1]:
+        return out
+    sums, full = _rolling_sums(values, window)
+    out[:, window - 1:] = np.where(full, sums / window, np.nan)
+    return out
+
+
+def _rolling_std(values, window):
+    mean = _rolling_mean(values, window)
+    mean_sq = _rolling_mean(values * values, window)
+    variance = np.clip(mean_sq - mean * mean, 0.0, None) * window / (window - 1)
+    return np.sqrt(variance)
+
+
+def _ewm(values, alpha):
+    out = np.full(values.shape, np.nan)
+    prev = np.full(values.shape[0], np.nan)
+    for t in range(values.shape[1]):
+        x = values[:, t]
+        prev = np.where(np.isnan(prev), x, np.where(np.isnan(x), prev, alpha * x + (1 - alpha) * prev))
+        out[:, t] = prev
+    return out
+
+
+def sma(closes, window):
+    return _shape_like(_rolling_mean(as_matrix(closes), window), closes)
+
+
+def ema(closes, span):
+    return _shape_like(_ewm(as_matrix(closes), 2.0 / (span + 1)), closes)
+
+
+def rsi(closes, period=14):
+    values = as_matrix(closes)
+    delta = np.diff(values, axis=1, prepend=np.nan)
+    gains = _ewm(np.where(delta > 0, delta, np.where(np.isnan(delta), np.nan, 0.0)), 1.0 / period)
+    losses = _ewm(np.where(delta < 0, -delta, np.where(np.isnan(delta), np.nan, 0.0)), 1.0 / period)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = np.where(losses == 0, 100.0, 100.0 - 100.0 / (1.0 + gains / losses))
+    counts = np.cumsum(~np.isnan(delta), axis=1)
+    result[(counts < period) | np.isnan(gains)] = np.nan
+    return _shape_like(result, closes)
+
+
+def macd(closes, fast=12, slow=26, signal=9):
+    values = as_matrix(closes)
+    line = _ewm(values, 2.0 / (fast + 1)) - _ewm(values, 2.0 / (slow + 1))
+    signal_line = _ewm(line, 2.0 / (signal + 1))
+    return tuple(_shape_like(result, closes) for result in (line, signal_line, line - signal_line))
+
+
+def bollinger(closes, window=20, k=2.0):
+    values = as_matrix(closes)
+    mid = _rolling_mean(values, window)
+    width = k * _rolling_std(values, window)
+    return tuple(_shape_like(result, closes) for result in (mid, mid + width, mid - width))
+
+
+def volatility(closes, window=20, periods=252):
+    values = as_matrix(closes)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(values), axis=1, prepend=np.nan)
+    return _shape_like(_rolling_std(returns, window) * np.sqrt(periods), closes)
+
+
+def compute_all(closes, ma_windows=(5, 20, 50, 200)):
+    values = as_matrix(closes)
+    result = {f"MA{window}": _rolling_mean(values, window) for window in ma_windows}
+    result["EMA20"] = _ewm(values, 2.0 / 21)
+    result["RSI14"] = rsi(values)
+    result["MACD"], result["MACD_SIGNAL"], result["MACD_HIST"] = macd(values)
+    result["BB_MID"], result["BB_UPPER"], result["BB_LOWER"] = bollinger(values)
+    result["VOLATILITY"] = volatility(values)
+    return {name: _shape_like(array, closes) for name, array in result.items()}
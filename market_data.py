@@ -0,0 +1,309 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import pandas as pd
+import yfinance as yf
+
+from metrics import external_calls
+
+QUOTE_TTL = float(os.getenv("QUOTE_TTL", "30"))
+QUOTE_CACHE_SIZE = int(os.getenv("QUOTE_CACHE_SIZE", "2048"))
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", os.path.join("downloads", "symbols.json"))
+SYMBOL_NEGATIVE_TTL = float(os.getenv("SYMBOL_NEGATIVE_TTL", "86400"))
+SYMBOL_MISS_TTL = float(os.getenv("SYMBOL_MISS_TTL", "3600"))
+PROBE_TICKER = "XU100.IS"
+
+
+class QuoteCache:
+    def __init__(self, ttl=30, max_size=2048):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def lookup(self, keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                value = self._fresh(key, now)
+                if value is not None:
+                    self.hits += 1
+                    return key, value
+            self.misses += 1
+        return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def single_flight(self, keys, loader):
+        owned, waiting = {}, {}
+        with self._lock:
+            for key in keys:
+                if key in self._inflight:
+                    waiting[key] = self._inflight[key]
+                else:
+                    owned[key] = self._inflight[key] = Future()
+
+        results = {}
+        if owned:
+            try:
+                loaded = loader(list(owned))
+            except Exception as e:
+                for future in owned.values():
+                    future.set_exception(e)
+                raise
+            else:
+                for key, future in owned.items():
+                    future.set_result(loaded.get(key))
+                results.update((key, value) for key, value in loaded.items() if key in owned)
+            finally:
+                with self._lock:
+                    for key in owned:
+                        self._inflight.pop(key, None)
+
+        for key, future in waiting.items():
+            try:
+                value = future.result()
+            except Exception:
+                continue
+            if value is not None:
+                results[key] = value
+        return results
+
+
+def asset_class(ticker):
+    if ticker.endswith(".IS"):
+        return "bist"
+    if ticker.endswith("=X"):
+        return "fx"
+    if ticker.endswith("=F"):
+        return "commodity"
+    if ticker.endswith(("-USD", "-EUR", "-TRY")):
+        return "crypto"
+    if ticker.startswith("^"):
+        return "index"
+    return "equity"
+
+
+class SymbolIndex:
+    def __init__(self, path, negative_ttl=86400, miss_ttl=3600):
+        self.path = path
+        self.negative_ttl = negative_ttl
+        self.miss_ttl = miss_ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            self._entries = {}
+        except Exception as e:
+            print(f"Sembol indeksi okunamadı: {e}")
+            self._entries = {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def get(self, symbol):
+        with self._lock:
+            entry = self._entries.get(symbol)
+        if entry is None:
+            return None
+        if entry["ticker"] is None:
+            ttl = self.negative_ttl if entry.get("misses", 1) > 1 else self.miss_ttl
+            if time.time() - entry["checked_at"] > ttl:
+                return None
+        return entry
+
+    def update(self, resolved, missing=()):
+        now = time.time()
+        with self._lock:
+            changed = False
+            for symbol, ticker in resolved.items():
+                if self._entries.get(symbol, {}).get("ticker") != ticker:
+                    self._entries[symbol] = {"ticker": ticker, "asset_class": asset_class(ticker), "checked_at": now}
+                    changed = True
+            for symbol in missing:
+                previous = self._entries.get(symbol, {})
+                misses = previous.get("misses", 1) + 1 if previous.get("ticker", 0) is None else 1
+                self._entries[symbol] = {"ticker": None, "asset_class": None, "checked_at": now, "misses": misses}
+                changed = True
+            if changed:
+                try:
+                    self.save()
+                except Exception as e:
+                    print(f"Sembol indeksi kaydedilemedi: {e}")
+
+
+quote_cache = QuoteCache(ttl=QUOTE_TTL, max_size=QUOTE_CACHE_SIZE)
+symbol_index = SymbolIndex(SYMBOL_INDEX_PATH, negative_ttl=SYMBOL_NEGATIVE_TTL, miss_ttl=SYMBOL_MISS_TTL)
+
+
+def candidate_symbols(symbol):
+    entry = symbol_index.get(symbol)
+    if entry is not None:
+        return [entry["ticker"]] if entry["ticker"] else []
+    if "." not in symbol:
+        return [symbol + ".IS", symbol]
+    return [symbol]
+
+
+def indexed_ticker(symbol):
+    entry = symbol_index.get(symbol)
+    return entry["ticker"] if entry else None
+
+
+def resolve_symbols(symbols):
+    resolved, unknown = {}, []
+    for symbol in dict.fromkeys(symbols):
+        entry = symbol_index.get(symbol)
+        if entry is None:
+            unknown.append(symbol)
+        elif entry["ticker"]:
+            resolved[symbol] = entry["ticker"]
+    if unknown:
+        resolved.update({symbol: quote[0] for symbol, quote in get_quotes(unknown).items()})
+    return resolved
+
+
+def download_bars(tickers, period="5d", interval="1d", start=None):
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return {}
+
+    window = {"start": start} if start else {"period": period}
+    with external_calls.time(target="yahoo_download"):
+        df = yf.download(
+            tickers,
+            interval=interval,
+            group_by="ticker",
+            auto_adjust=False,
+            progress=False,
+            threads=True,
+            **window,
+        )
+    frames = {}
+    if df is None or df.empty:
+        return frames
+
+    for ticker in tickers:
+        try:
+            if isinstance(df.columns, pd.MultiIndex):
+                if ticker not in df.columns.get_level_values(0):
+                    continue
+                frame = df[ticker]
+            elif len(tickers) == 1:
+                frame = df
+            else:
+                continue
+        except KeyError:
+            continue
+
+        frame = frame.dropna(subset=["Close"])
+        if frame.empty:
+            continue
+        frame = frame.copy()
+        frame.index = pd.to_datetime(frame.index.date)
+        frames[ticker] = frame[~frame.index.duplicated(keep="last")]
+    return frames
+
+
+def download_closes(tickers, period="5d", interval="1d"):
+    return {
+        ticker: frame["Close"]
+        for ticker, frame in download_bars(tickers, period=period, interval=interval).items()
+    }
+
+
+def resolve_closes(symbols, period="5d", interval="1d", exact=()):
+    candidates = {symbol: candidate_symbols(symbol) for symbol in dict.fromkeys(symbols)}
+    unknown = [symbol for symbol in candidates if symbol_index.get(symbol) is None]
+    exact = list(exact)
+    requested = [ticker for tickers in candidates.values() for ticker in tickers] + exact
+    if unknown and PROBE_TICKER not in requested:
+        requested.append(PROBE_TICKER)
+    closes = download_closes(requested, period=period, interval=interval)
+
+    resolved = {ticker: (ticker, closes[ticker]) for ticker in exact if ticker in closes}
+    for symbol, tickers in candidates.items():
+        for ticker in tickers:
+            if ticker in closes:
+                resolved[symbol] = (ticker, closes[ticker])
+                break
+
+    if closes:
+        symbol_index.update(
+            {symbol: resolved[symbol][0] for symbol in candidates if symbol in resolved},
+            missing=[symbol for symbol in unknown if symbol not in resolved],
+        )
+    return resolved
+
+
+def _download_quotes(symbols):
+    quotes = {
+        symbol: (symbol_full, float(series.iloc[-1]))
+        for symbol, (symbol_full, series) in resolve_closes(symbols).items()
+    }
+    for symbol_full, price in quotes.values():
+        quote_cache.put(symbol_full, price)
+    return quotes
+
+
+def cached_quote(symbol):
+    candidates = candidate_symbols(symbol)
+    if not candidates:
+        return None
+    return quote_cache.lookup(candidates)
+
+
+def get_quotes(symbols):
+    quotes = {}
+    missing = []
+    for symbol in dict.fromkeys(symbols):
+        if not candidate_symbols(symbol):
+            continue
+        cached = cached_quote(symbol)
+        if cached is None:
+            missing.append(symbol)
+        else:
+            quotes[symbol] = cached
+    if missing:
+        quotes.update(quote_cache.single_flight(missing, _download_quotes))
+    return quotes
+
+
+def get_quote(symbol):
+    return get_quotes([symbol]).get(symbol)
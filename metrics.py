@@ -0,0 +1,221 @@
+import bisect
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_DUMP_MINUTES = int(os.getenv("METRICS_DUMP_MINUTES", "0"))
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, help, collect=None):
+        self.name = name
+        self.help = help
+        self.collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def samples(self):
+        if self.collect is not None:
+            values = self.collect()
+            if not isinstance(values, dict):
+                values = {(): values}
+            return [(key, value) for key, value in values.items()]
+        with self._lock:
+            return list(self._values.items())
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class HistogramValue:
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def quantile(self, q, buckets):
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return buckets[i] if i < len(buckets) else float("inf")
+        return float("inf")
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=BUCKETS):
+        super().__init__(name, help)
+        self.buckets = buckets
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = HistogramValue(self.buckets)
+            entry.counts[bisect.bisect_left(self.buckets, value)] += 1
+            entry.count += 1
+            entry.sum += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(key, list(entry.counts), entry.count, entry.sum) for key, entry in self._values.items()]
+        for key, counts, count, total in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+    def summary(self):
+        with self._lock:
+            return [
+                (key, entry.count, entry.sum / entry.count if entry.count else 0.0,
+                 entry.quantile(0.5, self.buckets), entry.quantile(0.99, self.buckets))
+                for key, entry in self._values.items()
+            ]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, help, **kwargs)
+            return metric
+
+    def counter(self, name, help, collect=None):
+        return self._get(Counter, name, help, collect=collect)
+
+    def gauge(self, name, help, collect=None):
+        return self._get(Gauge, name, help, collect=collect)
+
+    def histogram(self, name, help, buckets=BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                print(f"{metric.name} metriği okunamadı: {e}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        print(f"📏 Metrikler - {time.strftime('%H:%M:%S')}")
+        for metric in metrics:
+            try:
+                if isinstance(metric, Histogram):
+                    for key, count, mean, p50, p99 in metric.summary():
+                        print(
+                            f"  {metric.name}{_format_labels(key)}: n={count}, ort={mean * 1000:.0f} ms, "
+                            f"p50≤{p50 * 1000:.0f} ms, p99≤{p99 * 1000:.0f} ms"
+                        )
+                else:
+                    for key, value in metric.samples():
+                        print(f"  {metric.name}{_format_labels(key)}: {value}")
+            except Exception as e:
+                print(f"{metric.name} metriği okunamadı: {e}")
+
+
+registry = Registry()
+external_calls = registry.histogram("external_call_seconds", "Dış servis çağrılarının süresi")
+handler_latency = registry.histogram("handler_seconds", "Mesaj ve zamanlanmış iş işleyicilerinin süresi")
+
+
+def timed(histogram, **labels):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with histogram.time(**labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port):
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    print(f"📏 Metrikler http://0.0.0.0:{port}/metrics adresinde")
+    return server
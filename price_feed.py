@@ -0,0 +1,133 @@
+import csv
+import threading
+import time
+from abc import ABC, abstractmethod
+
+import yfinance as yf
+
+
+class PriceFeed(ABC):
+    def __init__(self, on_tick):
+        self.on_tick = on_tick
+        self.symbols = set()
+        self.connected = False
+        self.last_tick = {}
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def set_symbols(self, symbols):
+        symbols = set(symbols)
+        with self._lock:
+            added = symbols - self.symbols
+            removed = self.symbols - symbols
+            self.symbols = symbols
+        if added or removed:
+            self._resubscribe(added, removed)
+
+    def _resubscribe(self, added, removed):
+        pass
+
+    def _tick(self, ticker, price):
+        with self._lock:
+            if ticker not in self.symbols:
+                return
+        self.last_tick[ticker] = time.monotonic()
+        try:
+            self.on_tick(ticker, price)
+        except Exception as e:
+            print(f"{ticker} fiyat akışı işlenirken hata: {e}")
+
+    def is_fresh(self, ticker, max_age):
+        if not self.connected:
+            return False
+        seen = self.last_tick.get(ticker)
+        return seen is not None and time.monotonic() - seen <= max_age
+
+    @abstractmethod
+    def _run(self):
+        ...
+
+
+class YahooStreamFeed(PriceFeed):
+    def __init__(self, on_tick, reconnect_wait=5):
+        if not hasattr(yf, "WebSocket"):
+            raise RuntimeError("Yüklü yfinance sürümü WebSocket desteklemiyor")
+        super().__init__(on_tick)
+        self.reconnect_wait = reconnect_wait
+        self.ws = None
+
+    def _resubscribe(self, added, removed):
+        ws = self.ws
+        if ws is None or not self.connected:
+            return
+        try:
+            if added:
+                ws.subscribe(sorted(added))
+            if removed:
+                ws.unsubscribe(sorted(removed))
+        except Exception as e:
+            print(f"Fiyat akışı abonelikleri güncellenemedi: {e}")
+
+    def _handle(self, message):
+        ticker = message.get("id")
+        price = message.get("price")
+        if ticker and price:
+            self._tick(ticker, float(price))
+
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                symbols = sorted(self.symbols)
+            if not symbols:
+                self._stopped.wait(1)
+                continue
+
+            try:
+                self.ws = yf.WebSocket()
+                self.ws.subscribe(symbols)
+                self.connected = True
+                print(f"📡 Canlı fiyat akışı bağlandı: {len(symbols)} sembol")
+                self.ws.listen(self._handle)
+            except Exception as e:
+                print(f"Canlı fiyat akışı koptu: {e}")
+            finally:
+                self.connected = False
+                try:
+                    self.ws.close()
+                except Exception:
+                    pass
+                self.ws = None
+            self._stopped.wait(self.reconnect_wait)
+
+
+class ReplayFeed(PriceFeed):
+    def __init__(self, on_tick, ticks, interval=0.0):
+        super().__init__(on_tick)
+        self.ticks = list(ticks)
+        self.interval = interval
+
+    @classmethod
+    def from_csv(cls, on_tick, path, interval=0.0):
+        with open(path, newline="", encoding="utf-8") as f:
+            ticks = [(row["ticker"], float(row["price"])) for row in csv.DictReader(f)]
+        return cls(on_tick, ticks, interval)
+
+    def _run(self):
+        self.connected = True
+        try:
+            for ticker, price in self.ticks:
+                if self._stopped.is_set():
+                    break
+                self._tick(ticker, price)
+                if self.interval:
+                    time.sleep(self.interval)
+        finally:
+            self.connected = False
@@ -0,0 +1,194 @@
+import threading
+from contextlib import contextmanager
+
+from alert_index import AlertIndex
+from metrics import external_calls
+
+
+class Repository:
+    def __init__(self, storage):
+        self.storage = storage
+        self.loaded = False
+        self._users = {}
+        self._portfolios = {}
+        self._alerts_by_chat = {}
+        self._alerts_by_symbol = {}
+        self.alert_index = AlertIndex()
+        self._generation = 0
+        self._pending_writes = 0
+        self._lock = threading.RLock()
+
+    def _call(self, op, *args):
+        with external_calls.time(target="storage", op=op):
+            return getattr(self.storage, op)(*args)
+
+    @contextmanager
+    def _write(self):
+        with self._lock:
+            self._pending_writes += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pending_writes -= 1
+                self._generation += 1
+
+    def _index_alerts(self, alerts):
+        by_chat, by_symbol = {}, {}
+        for alert in alerts:
+            alert = {
+                "id": alert.get("id"),
+                "chat_id": alert["chat_id"],
+                "symbol": alert["symbol"],
+                "target_price": alert["target_price"],
+                "percent": alert.get("percent"),
+            }
+            by_chat.setdefault(str(alert["chat_id"]), []).append(alert)
+            by_symbol.setdefault(alert["symbol"], []).append(alert)
+        return by_chat, by_symbol
+
+    def load(self):
+        with self._lock:
+            generation, busy = self._generation, self._pending_writes
+        try:
+            users = self._call("load_users")
+            portfolios = self._call("load_portfolios")
+            alerts = self._call("load_alerts")
+        except Exception as e:
+            print(f"Veriler yüklenirken hata: {e}")
+            return False
+
+        by_chat, by_symbol = self._index_alerts(alerts)
+        with self._lock:
+            if self.loaded and (busy or self._pending_writes or self._generation != generation):
+                print("🗄️ Yükleme sırasında veri değişti, önbellek korunuyor")
+                return False
+            self._users = {str(chat_id): chat_id for chat_id in users}
+            self._portfolios = portfolios
+            self._alerts_by_chat = by_chat
+            self._alerts_by_symbol = by_symbol
+            self.alert_index.rebuild(alert for alerts in by_symbol.values() for alert in alerts)
+            self.loaded = True
+        print(f"🗄️ Veriler yüklendi: {len(users)} kullanıcı, {len(portfolios)} portföy, {len(alerts)} alarm")
+        return True
+
+    def _ensure_loaded(self):
+        if not self.loaded:
+            with self._lock:
+                if not self.loaded:
+                    self.load()
+
+    def active_users(self):
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._users.values())
+
+    def is_active(self, chat_id):
+        self._ensure_loaded()
+        return str(chat_id) in self._users
+
+    def activate_user(self, chat_id):
+        with self._write():
+            if self._call("save_user", chat_id):
+                with self._lock:
+                    self._users[str(chat_id)] = chat_id
+
+    def deactivate_user(self, chat_id):
+        with self._write():
+            if self._call("deactivate_user", chat_id):
+                with self._lock:
+                    self._users.pop(str(chat_id), None)
+
+    def portfolio(self, chat_id):
+        self._ensure_loaded()
+        with self._lock:
+            return [dict(item) for item in self._portfolios.get(str(chat_id), [])]
+
+    def portfolios(self):
+        self._ensure_loaded()
+        with self._lock:
+            return {chat_id: [dict(item) for item in items] for chat_id, items in self._portfolios.items()}
+
+    def save_portfolio(self, chat_id, portfolio):
+        with self._write():
+            previous = self.portfolio(chat_id)
+            if self._call("save_portfolio", chat_id, portfolio, previous):
+                with self._lock:
+                    if portfolio:
+                        self._portfolios[str(chat_id)] = [dict(item) for item in portfolio]
+                    else:
+                        self._portfolios.pop(str(chat_id), None)
+
+    def alerts(self, chat_id):
+        self._ensure_loaded()
+        with self._lock:
+            return [
+                {"symbol": alert["symbol"], "target_price": alert["target_price"], "percent": alert["percent"]}
+                for alert in self._alerts_by_chat.get(str(chat_id), [])
+            ]
+
+    def alert_symbols(self, active_only=True):
+        self._ensure_loaded()
+        with self._lock:
+            return [
+                symbol for symbol, alerts in self._alerts_by_symbol.items()
+                if not active_only or any(str(alert["chat_id"]) in self._users for alert in alerts)
+            ]
+
+    def add_alert(self, chat_id, symbol, target_price, percent=None, price=None):
+        with self._write():
+            alert_id = self._call("save_alert", chat_id, symbol, target_price, percent)
+            if alert_id is None:
+                return
+            alert = {
+                "id": alert_id,
+                "chat_id": chat_id,
+                "symbol": symbol.upper(),
+                "target_price": float(target_price),
+                "percent": float(percent) if percent else None,
+            }
+            with self._lock:
+                self._alerts_by_chat.setdefault(str(chat_id), []).append(alert)
+                self._alerts_by_symbol.setdefault(alert["symbol"], []).append(alert)
+                self.alert_index.add(alert, price)
+
+    def remove_alert(self, chat_id, symbol):
+        with self._write():
+            if not self._call("remove_alert", chat_id, symbol):
+                return
+            symbol = symbol.upper()
+            with self._lock:
+                chat_alerts = [a for a in self._alerts_by_chat.get(str(chat_id), []) if a["symbol"] != symbol]
+                if chat_alerts:
+                    self._alerts_by_chat[str(chat_id)] = chat_alerts
+                else:
+                    self._alerts_by_chat.pop(str(chat_id), None)
+
+                symbol_alerts = [a for a in self._alerts_by_symbol.get(symbol, []) if str(a["chat_id"]) != str(chat_id)]
+                if symbol_alerts:
+                    self._alerts_by_symbol[symbol] = symbol_alerts
+                else:
+                    self._alerts_by_symbol.pop(symbol, None)
+                self.alert_index.remove(chat_id, symbol)
+
+    def delete_alert(self, alert):
+        with self._write():
+            if alert.get("id") is None:
+                self.remove_alert(alert["chat_id"], alert["symbol"])
+                return
+            if not self._call("delete_alert", alert["id"]):
+                return
+            chat_id, symbol = str(alert["chat_id"]), alert["symbol"]
+            with self._lock:
+                chat_alerts = [a for a in self._alerts_by_chat.get(chat_id, []) if a.get("id") != alert["id"]]
+                if chat_alerts:
+                    self._alerts_by_chat[chat_id] = chat_alerts
+                else:
+                    self._alerts_by_chat.pop(chat_id, None)
+
+                symbol_alerts = [a for a in self._alerts_by_symbol.get(symbol, []) if a.get("id") != alert["id"]]
+                if symbol_alerts:
+                    self._alerts_by_symbol[symbol] = symbol_alerts
+                else:
+                    self._alerts_by_symbol.pop(symbol, None)
+                self.alert_index.discard(symbol, alert["id"])
@@ -0,0 +1,330 @@
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+
+def diff_portfolio(previous, portfolio):
+    before = {item["symbol"]: item for item in previous}
+    after = {item["symbol"]: item for item in portfolio}
+    upserts = [
+        item for symbol, item in after.items()
+        if symbol not in before
+        or before[symbol]["quantity"] != item["quantity"]
+        or before[symbol]["avg_price"] != item["avg_price"]
+    ]
+    removed = [symbol for symbol in before if symbol not in after]
+    return upserts, removed
+
+
+class Storage(ABC):
+    @abstractmethod
+    def load_users(self):
+        ...
+
+    @abstractmethod
+    def save_user(self, chat_id):
+        ...
+
+    @abstractmethod
+    def deactivate_user(self, chat_id):
+        ...
+
+    @abstractmethod
+    def load_portfolios(self):
+        ...
+
+    @abstractmethod
+    def load_portfolio(self, chat_id):
+        ...
+
+    @abstractmethod
+    def save_portfolio(self, chat_id, portfolio, previous=None):
+        ...
+
+    @abstractmethod
+    def load_alerts(self):
+        ...
+
+    @abstractmethod
+    def save_alert(self, chat_id, symbol, target_price, percent=None):
+        ...
+
+    @abstractmethod
+    def remove_alert(self, chat_id, symbol):
+        ...
+
+    @abstractmethod
+    def delete_alert(self, alert_id):
+        ...
+
+
+class SupabaseStorage(Storage):
+    def __init__(self, client):
+        self.client = client
+
+    def load_users(self):
+        response = self.client.table("users").select("chat_id").eq("is_active", True).execute()
+        return [user["chat_id"] for user in response.data]
+
+    def save_user(self, chat_id):
+        try:
+            existing = self.client.table("users").select("chat_id").eq("chat_id", chat_id).execute()
+            if existing.data:
+                self.client.table("users").update({"is_active": True}).eq("chat_id", chat_id).execute()
+            else:
+                self.client.table("users").insert({"chat_id": chat_id, "is_active": True}).execute()
+            self.client.table("user_logs").insert({
+                "chat_id": chat_id,
+                "action": "joined"
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"Kullanıcı {chat_id} kaydedilirken hata: {e}")
+            return False
+
+    def deactivate_user(self, chat_id):
+        try:
+            self.client.table("users").update({"is_active": False}).eq("chat_id", chat_id).execute()
+            self.client.table("user_logs").insert({
+                "chat_id": chat_id,
+                "action": "left"
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"Kullanıcı {chat_id} pasif yapılırken hata: {e}")
+            return False
+
+    def load_portfolios(self):
+        portfolios = {}
+        result = self.client.table("portfolios").select("chat_id", "symbol", "quantity", "avg_price").execute()
+        for row in result.data:
+            portfolios.setdefault(str(row["chat_id"]), []).append({
+                "symbol": row["symbol"],
+                "quantity": row["quantity"],
+                "avg_price": row["avg_price"]
+            })
+        return portfolios
+
+    def load_portfolio(self, chat_id):
+        result = self.client.table("portfolios").select("symbol", "quantity", "avg_price").eq("chat_id", chat_id).execute()
+        return result.data
+
+    def save_portfolio(self, chat_id, portfolio, previous=None):
+        try:
+            if previous is None:
+                previous = self.load_portfolio(chat_id)
+            upserts, removed = diff_portfolio(previous, portfolio)
+            if upserts:
+                self.client.table("portfolios").upsert([
+                    {
+                        "chat_id": chat_id,
+                        "symbol": item["symbol"],
+                        "quantity": item["quantity"],
+                        "avg_price": item["avg_price"]
+                    }
+                    for item in upserts
+                ], on_conflict="chat_id,symbol").execute()
+            if removed:
+                self.client.table("portfolios").delete().eq("chat_id", chat_id).in_("symbol", removed).execute()
+            return True
+        except Exception as e:
+            print(f"{chat_id} için portföy kaydedilirken hata: {e}")
+            return False
+
+    def load_alerts(self):
+        response = self.client.table("alerts").select("*").execute()
+        return response.data
+
+    def save_alert(self, chat_id, symbol, target_price, percent=None):
+        try:
+            row = {
+                "chat_id": chat_id,
+                "symbol": symbol.upper(),
+                "target_price": float(target_price)
+            }
+            if percent:
+                row["percent"] = float(percent)
+            response = self.client.table("alerts").insert(row).execute()
+            return response.data[0]["id"]
+        except Exception as e:
+            print(f"Alarm kaydedilirken hata: {e}")
+            return None
+
+    def remove_alert(self, chat_id, symbol):
+        try:
+            self.client.table("alerts").delete().eq("chat_id", chat_id).eq("symbol", symbol.upper()).execute()
+            return True
+        except Exception as e:
+            print(f"Alarm silinirken hata: {e}")
+            return False
+
+    def delete_alert(self, alert_id):
+        try:
+            self.client.table("alerts").delete().eq("id", alert_id).execute()
+            return True
+        except Exception as e:
+            print(f"Alarm silinirken hata: {e}")
+            return False
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    chat_id INTEGER PRIMARY KEY,
+    is_active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS users_is_active_idx ON users (is_active);
+
+CREATE TABLE IF NOT EXISTS user_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    action TEXT NOT NULL,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS user_logs_chat_id_idx ON user_logs (chat_id);
+
+CREATE TABLE IF NOT EXISTS portfolios (
+    chat_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    quantity REAL NOT NULL,
+    avg_price REAL NOT NULL,
+    PRIMARY KEY (chat_id, symbol)
+);
+CREATE INDEX IF NOT EXISTS portfolios_symbol_idx ON portfolios (symbol);
+
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chat_id INTEGER NOT NULL,
+    symbol TEXT NOT NULL,
+    target_price REAL NOT NULL,
+    percent REAL
+);
+CREATE INDEX IF NOT EXISTS alerts_chat_id_symbol_idx ON alerts (chat_id, symbol);
+CREATE INDEX IF NOT EXISTS alerts_symbol_idx ON alerts (symbol);
+"""
+
+
+class SQLiteStorage(Storage):
+    def __init__(self, path):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SQLITE_SCHEMA)
+            columns = {row["name"] for row in self.conn.execute("PRAGMA table_info(alerts)")}
+            if "percent" not in columns:
+                self.conn.execute("ALTER TABLE alerts ADD COLUMN percent REAL")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def load_users(self):
+        return [row["chat_id"] for row in self._query("SELECT chat_id FROM users WHERE is_active = 1")]
+
+    def _set_active(self, chat_id, active, action):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO users (chat_id, is_active) VALUES (?, ?) "
+                "ON CONFLICT (chat_id) DO UPDATE SET is_active = excluded.is_active",
+                (chat_id, int(active)),
+            )
+            self.conn.execute("INSERT INTO user_logs (chat_id, action) VALUES (?, ?)", (chat_id, action))
+
+    def save_user(self, chat_id):
+        try:
+            self._set_active(chat_id, True, "joined")
+            return True
+        except Exception as e:
+            print(f"Kullanıcı {chat_id} kaydedilirken hata: {e}")
+            return False
+
+    def deactivate_user(self, chat_id):
+        try:
+            self._set_active(chat_id, False, "left")
+            return True
+        except Exception as e:
+            print(f"Kullanıcı {chat_id} pasif yapılırken hata: {e}")
+            return False
+
+    def load_portfolios(self):
+        portfolios = {}
+        for row in self._query("SELECT chat_id, symbol, quantity, avg_price FROM portfolios"):
+            portfolios.setdefault(str(row["chat_id"]), []).append({
+                "symbol": row["symbol"],
+                "quantity": row["quantity"],
+                "avg_price": row["avg_price"]
+            })
+        return portfolios
+
+    def load_portfolio(self, chat_id):
+        return self._query("SELECT symbol, quantity, avg_price FROM portfolios WHERE chat_id = ?", (chat_id,))
+
+    def save_portfolio(self, chat_id, portfolio, previous=None):
+        try:
+            if previous is None:
+                previous = self.load_portfolio(chat_id)
+            upserts, removed = diff_portfolio(previous, portfolio)
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT INTO portfolios (chat_id, symbol, quantity, avg_price) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (chat_id, symbol) DO UPDATE SET quantity = excluded.quantity, avg_price = excluded.avg_price",
+                    [(chat_id, item["symbol"], item["quantity"], item["avg_price"]) for item in upserts],
+                )
+                self.conn.executemany(
+                    "DELETE FROM portfolios WHERE chat_id = ? AND symbol = ?",
+                    [(chat_id, symbol) for symbol in removed],
+                )
+            return True
+        except Exception as e:
+            print(f"{chat_id} için portföy kaydedilirken hata: {e}")
+            return False
+
+    def load_alerts(self):
+        return self._query("SELECT id, chat_id, symbol, target_price, percent FROM alerts")
+
+    def save_alert(self, chat_id, symbol, target_price, percent=None):
+        try:
+            with self._lock, self.conn:
+                cursor = self.conn.execute(
+                    "INSERT INTO alerts (chat_id, symbol, target_price, percent) VALUES (?, ?, ?, ?)",
+                    (chat_id, symbol.upper(), float(target_price), float(percent) if percent else None),
+                )
+            return cursor.lastrowid
+        except Exception as e:
+            print(f"Alarm kaydedilirken hata: {e}")
+            return None
+
+    def remove_alert(self, chat_id, symbol):
+        try:
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM alerts WHERE chat_id = ? AND symbol = ?", (chat_id, symbol.upper()))
+            return True
+        except Exception as e:
+            print(f"Alarm silinirken hata: {e}")
+            return False
+
+    def delete_alert(self, alert_id):
+        try:
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
+            return True
+        except Exception as e:
+            print(f"Alarm silinirken hata: {e}")
+            return False
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def create_storage(backend, sqlite_path=None, supabase_url=None, supabase_key=None):
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path)
+    if backend == "supabase":
+        from supabase import create_client
+
+        return SupabaseStorage(create_client(supabase_url, supabase_key))
+    raise ValueError(f"Bilinmeyen depolama türü: {backend}")
@@ -0,0 +1,102 @@
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from metrics import external_calls
+
+FUND_URL = "https://www.tefas.gov.tr/FonAnaliz.aspx?FonKod={}"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'tr-TR,tr;q=0.9',
+    'Referer': 'https://www.tefas.gov.tr/',
+}
+COOKIES = {
+    'ASP.NET_SessionId': 'xyz123',
+}
+
+INFO_XPATHS = {
+    "Fiyat": '//*[@id="MainContent_PanelInfo"]/div[1]/ul[1]/li[1]/span',
+    "Günlük Getiri": '//*[@id="MainContent_PanelInfo"]/div[1]/ul[1]/li[2]/span',
+    "Yatırımcı Sayısı": '//*[@id="MainContent_PanelInfo"]/div[1]/ul[2]/li[2]/span',
+    "Fon Risk Seviyesi": '//*[@id="MainContent_DetailsViewFund"]/tbody/tr[15]/td[2]',
+    "Son 1 Ay Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[1]/span',
+    "Son 3 Ay Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[2]/span',
+    "Son 6 Ay Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[3]/span',
+    "Son 1 Yıl Getirisi": '//*[@id="MainContent_PanelInfo"]/div[2]/ul/li[4]/span'
+}
+
+PANEL_FIELDS = {
+    "Fiyat": (1, 1, 1),
+    "Günlük Getiri": (1, 1, 2),
+    "Yatırımcı Sayısı": (1, 2, 2),
+    "Son 1 Ay Getirisi": (2, 1, 1),
+    "Son 3 Ay Getirisi": (2, 1, 2),
+    "Son 6 Ay Getirisi": (2, 1, 3),
+    "Son 1 Yıl Getirisi": (2, 1, 4),
+}
+
+MISSING = "Bilgi alınamadı"
+
+
+def _child(tag, name, position):
+    children = tag.find_all(name, recursive=False) if tag else []
+    return children[position - 1] if len(children) >= position else None
+
+
+def parse_fund_info(soup):
+    info = {}
+    panel = soup.find(id="MainContent_PanelInfo")
+    for key, (div, ul, li) in PANEL_FIELDS.items():
+        item = _child(_child(_child(panel, "div", div), "ul", ul), "li", li)
+        span = item.find("span") if item else None
+        info[key] = span.get_text(strip=True) if span else MISSING
+
+    info["Fon Risk Seviyesi"] = MISSING
+    details = soup.find(id="MainContent_DetailsViewFund")
+    rows = details.find_all("tr") if details else []
+    if len(rows) >= 15:
+        cells = rows[14].find_all("td")
+        if len(cells) >= 2:
+            info["Fon Risk Seviyesi"] = cells[1].get_text(strip=True)
+    return {key: info[key] for key in INFO_XPATHS}
+
+
+def parse_price_series(soup):
+    js_text = soup.find_all('script', type="text/javascript")
+
+    kacinci = None
+    for fiyat in range(len(js_text)):
+        if len(js_text[fiyat].contents) == 0:
+            continue
+        if js_text[fiyat].contents[0].find("chartMainContent_FonFiyatGrafik") > 0:
+            kacinci = fiyat
+            break
+
+    if kacinci is None:
+        return None
+
+    tarih_rakam = js_text[kacinci].contents[0].split("categories")
+    tarih = tarih_rakam[1].split("]")[0].split("[")[1]
+    rakam = tarih_rakam[1].split("[")[4].split("]")[0]
+
+    df = pd.DataFrame(columns=["Tarih", "Fiyat"])
+    df["Tarih"] = tarih.split(",")
+    df["Fiyat"] = rakam.split(",")
+
+    df["Tarih"] = df["Tarih"].str.replace('"', '')
+    df["Fiyat"] = df["Fiyat"].str.replace('"', '')
+
+    df["Tarih"] = pd.to_datetime(df["Tarih"], format="%d.%m.%Y")
+    df["Fiyat"] = pd.to_numeric(df["Fiyat"], errors='coerce')
+    return df
+
+
+def parse_fund_page(html):
+    soup = BeautifulSoup(html, features="html.parser")
+    return parse_fund_info(soup), parse_price_series(soup)
+
+
+def fetch_fund_page(session, code, timeout=10):
+    with external_calls.time(target="tefas_page"):
+        response = session.get(FUND_URL.format(code), headers=HEADERS, cookies=COOKIES, timeout=timeout)
+    return parse_fund_page(response.content)
@@ -0,0 +1,49 @@
+import numpy as np
+
+
+class PortfolioValuation:
+    def __init__(self, symbols, quantity, avg_price, price, total_value):
+        self.symbols = symbols
+        self.quantity = quantity
+        self.avg_price = avg_price
+        self.price = price
+        self.missing = [symbol for symbol, p in zip(symbols, price) if np.isnan(p)]
+        self.cost = quantity * avg_price
+        self.value = quantity * np.nan_to_num(price)
+        self.pnl = self.value - self.cost
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.roi = np.where(self.cost != 0, self.pnl / self.cost * 100, 0.0)
+            self.weight = self.value / total_value * 100 if total_value else np.zeros(len(symbols))
+        self.total_cost = float(self.cost.sum())
+        self.total_value = float(total_value)
+        self.total_pnl = self.total_value - self.total_cost
+        self.total_roi = self.total_pnl / self.total_cost * 100 if self.total_cost else 0.0
+
+    def __len__(self):
+        return len(self.symbols)
+
+
+def value_portfolios(portfolios, prices):
+    chat_ids = [chat_id for chat_id, items in portfolios.items() if items]
+    items = [item for chat_id in chat_ids for item in portfolios[chat_id]]
+    if not items:
+        return {}
+
+    symbols = [item["symbol"] for item in items]
+    quantity = np.fromiter((item["quantity"] for item in items), dtype=float, count=len(items))
+    avg_price = np.fromiter((item["avg_price"] for item in items), dtype=float, count=len(items))
+    price = np.fromiter((prices.get(symbol, np.nan) for symbol in symbols), dtype=float, count=len(items))
+
+    offsets = np.cumsum([0] + [len(portfolios[chat_id]) for chat_id in chat_ids])
+    totals = np.add.reduceat(quantity * np.nan_to_num(price), offsets[:-1])
+
+    return {
+        chat_id: PortfolioValuation(
+            symbols[start:end], quantity[start:end], avg_price[start:end], price[start:end], total
+        )
+        for chat_id, start, end, total in zip(chat_ids, offsets[:-1], offsets[1:], totals)
+    }
+
+
+def value_portfolio(portfolio, prices):
+    return value_portfolios({None: portfolio}, prices).get(None)